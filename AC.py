@@ -1,8 +1,15 @@
 import random
 import json
 
+import message_loss
+import seeding
+import tracing
+from node_store import store_backed
+
 
 class Node:
+    __slots__ = ('id', 'value', 'crashed')
+
     def __init__(self, id, initial_value):
         self.id = id
         self.value = initial_value
@@ -16,12 +23,21 @@ class Node:
         """Update value """
         for v_j in received_values:
             self.value = (self.value + v_j) / 2
-            print(
-                f'updated value by node id{self.id}: {self.value} when we have {v_j}')
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.STATE_UPDATE, self.id, self.value)
+
+
+# Scalar fields of a Node kept in a node_store.NodeStore when the algorithm runs with store=True
+STORED_FIELDS = {'value': 'd', 'crashed': 'b'}
 
 
 class ACAlgorithm:
-    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, epsilon, initial_ratio):
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, epsilon, initial_ratio, rng=None, store=False):
+        # Generator of this run, the global random module unless a seeded one is given
+        self.rng = random if rng is None else rng
+        # Node class of the run, with store=True one keeping STORED_FIELDS in its node_store.NodeStore
+        self.node_class = store_backed(
+            Node, total_nodes, 'id', STORED_FIELDS) if store else Node
         self.nodes = self.initialize_nodes(
             total_nodes, num_faulty_nodes, initial_ratio)
         self.total_nodes = total_nodes
@@ -35,15 +51,16 @@ class ACAlgorithm:
         num_ones = int((total_nodes) * initial_ratio)
         initial_values = [1] * num_ones + [0] * ((total_nodes) - num_ones)
         # Shuffle to distribute 1s and 0s randomly
-        random.shuffle(initial_values)
-        return [Node(i, initial_values[i]) for i in range(total_nodes)]
+        self.rng.shuffle(initial_values)
+        return [self.node_class(i, initial_values[i]) for i in range(total_nodes)]
 
     def initialize_crash_nodes(self):
         """Randomly crash `f` nodes that will no longer participate in the algorithm."""
-        crash_nodes = random.sample(self.nodes, self.num_faulty_nodes)
+        crash_nodes = self.rng.sample(self.nodes, self.num_faulty_nodes)
         for node in crash_nodes:
             node.crashed = True
-            print(f"Node {node.id} has crashed and will not participate.")
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.CRASH, node.id)
 
     def run(self):
         """Run the consensus algorithm until values converge within epsilon."""
@@ -53,25 +70,33 @@ class ACAlgorithm:
             # Initialize message storage
             messages = {node.id: [] for node in self.nodes if not node.crashed}
 
-            print(f"\n--- Round {rounds} ---")
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.ROUND, rounds)
 
             # Each node broadcasts its value to all other nodes
             for node in self.nodes:
                 if not node.crashed:
                     broadcasted_value = node.broadcast_value()
                     # Distribute broadcasted value to all other non-crashed nodes
-                    for recipient_node in self.nodes:
-                        if recipient_node.id != node.id and not recipient_node.crashed:
-                            # Simulate message loss
-                            if random.random() > self.message_loss_rate:
-                                messages[recipient_node.id].append(
-                                    (node.id, broadcasted_value))
-
-            # Print message logs for this round
-            # print("Message Logs:")
-            for receiver_id, msg_list in messages.items():
-                log = [(sender_id, value) for sender_id, value in msg_list]
-                # print(f"Node {receiver_id} received messages: {log}")
+                    recipients = [recipient_node for recipient_node in self.nodes
+                                  if recipient_node.id != node.id and not recipient_node.crashed]
+                    # Simulate message loss
+                    lost = message_loss.sample_losses(
+                        self.rng, len(recipients), self.message_loss_rate)
+                    for recipient_node, is_lost in zip(recipients, lost):
+                        if not is_lost:
+                            messages[recipient_node.id].append(
+                                (node.id, broadcasted_value))
+                        elif tracing.level <= tracing.DEBUG:
+                            tracing.emit(tracing.MESSAGE_LOST,
+                                         node.id, recipient_node.id)
+
+            # Message logs for this round
+            if tracing.level <= tracing.DEBUG:
+                for receiver_id, msg_list in messages.items():
+                    for sender_id, value in msg_list:
+                        tracing.emit(tracing.MESSAGE_RECEIVED,
+                                     receiver_id, sender_id, value)
 
             # Each node updates its value based on each received message individually
             for node in self.nodes:
@@ -116,17 +141,24 @@ if __name__ == "__main__":
             'epsilon': 0.01, 'initial_ratio': 0.8},
     ]
 
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
     results = []
 
     for config in configurations:
         for _ in range(num_runs):
+            seed = next(seeds)
             print(f"\nRunning AC with configuration: {config}")
             ac = ACAlgorithm(
                 total_nodes=config['N'],
                 num_faulty_nodes=config['f'],
                 message_loss_rate=config['message_loss_rate'],
                 epsilon=config['epsilon'],
-                initial_ratio=config['initial_ratio']
+                initial_ratio=config['initial_ratio'],
+                rng=seeding.make_rng(seed)
             )
             rounds = ac.run()
             ac.print_final_values()
@@ -136,7 +168,8 @@ if __name__ == "__main__":
                 'config': config,
                 'rounds': rounds,
                 'num_nodes': config['N'],
-                'message_loss_rate': config['message_loss_rate']
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
             }
             results.append(result)
 
@@ -3,6 +3,12 @@ import math
 import json
 from collections import defaultdict
 
+import message_loss
+import seeding
+import tracing
+from bitset import BitVector
+from node_store import store_backed
+
 # Calculate pend
 
 
@@ -11,14 +17,16 @@ def calculate_pend(epsilon):
 
 
 class Node:
+    __slots__ = ('id', 'phase', 'value', 'min_value', 'max_value', 'R', 'total_nodes', 'faulty')
+
     def __init__(self, id, initial_value, total_nodes):
         self.id = id
         self.phase = 0
         self.value = initial_value
         self.min_value = initial_value
         self.max_value = initial_value
-        self.R = [0] * total_nodes  # Bit vector tracking received messages
-        self.R[self.id] = 1  # Mark itself as received
+        # Bit vector tracking received messages, marking itself as received
+        self.R = BitVector.single(self.id)
         self.total_nodes = total_nodes
         self.faulty = False  # Node is non-faulty by default
 
@@ -26,9 +34,8 @@ class Node:
         """Reset values related to state and the received message bit vector (R) after advancing to the next phase."""
         self.min_value = self.value
         self.max_value = self.value
-        # Reset the bit vector for the new phase
-        self.R = [0] * self.total_nodes
-        self.R[self.id] = 1  # Mark itself as received again for the new phase
+        # Reset the bit vector for the new phase, marking itself as received again
+        self.R.reset(self.id)
 
     def update_value(self):
         """Update the node's value based on the min and max values received."""
@@ -44,14 +51,46 @@ class Node:
             return None
 
 
+# Rounds after which run() stops and reports the run as non-terminating
+MAX_ROUNDS = 1000
+
+# Scalar fields of a Node kept in a node_store.NodeStore when the algorithm runs with store=True
+STORED_FIELDS = {'phase': 'q', 'value': 'd', 'min_value': 'd', 'max_value': 'd', 'faulty': 'b'}
+
+
 class DACAlgorithm:
-    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon):
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon, rng=None, topology=None,
+                 mobility=None, store=False):
+        if mobility is not None and topology is None:
+            raise ValueError("A mobility model moves the nodes of a topology, pass a topology too")
+        if mobility is not None and topology.positions != list(mobility.positions):
+            raise ValueError(
+                "The topology does not start from the positions of the mobility model, "
+                "build it with GridTopology.from_mobility")
         self.total_nodes = total_nodes
+        # Optional topology.GridTopology limiting broadcasts to radio range, all-to-all if None
+        self.topology = topology
+        # Optional mobility model moving the nodes of the topology between rounds
+        self.mobility = mobility
+        # Neighbours gained and lost by each node in the last move, see GridTopology.move
+        self.neighbour_changes = {}
+        # Generator of this run, the global random module unless a seeded one is given
+        self.rng = random if rng is None else rng
         self.message_loss_rate = message_loss_rate
         self.pend = calculate_pend(epsilon)
+        # Node class of the run, with store=True one keeping STORED_FIELDS in its node_store.NodeStore
+        self.node_class = store_backed(
+            Node, total_nodes, 'id', STORED_FIELDS) if store else Node
         self.nodes = []
-        self.faulty_nodes = random.sample(range(total_nodes), num_faulty_nodes)
+        self.faulty_nodes = self.rng.sample(range(total_nodes), num_faulty_nodes)
         self.initialize_nodes(initial_ratio)
+        unreachable = self.unreachable_quorums()
+        if unreachable:
+            raise ValueError(
+                f"{len(unreachable)} correct nodes, e.g. node {min(unreachable)}, hear fewer correct nodes "
+                f"than their quorum and can never advance")
+        # Correct nodes a move left without a reachable quorum, left out of the termination check
+        self.stranded = set()
 
     def initialize_nodes(self, ratio):
         """Initialize the nodes with binary values based on the input ratio."""
@@ -59,47 +98,120 @@ class DACAlgorithm:
                        ratio)
         num_zeros = self.total_nodes - num_ones   # The rest will have value 0
         values = [1] * num_ones + [0] * num_zeros
-        random.shuffle(values)
+        self.rng.shuffle(values)
 
         # Assign the values to the nodes
+        faulty_nodes = set(self.faulty_nodes)
         for i in range(self.total_nodes):
-            node = Node(i, values[i], self.total_nodes)
-            if i in self.faulty_nodes:
+            node = self.node_class(i, values[i], self.total_nodes)
+            if i in faulty_nodes:
                 node.faulty = True
             self.nodes.append(node)
 
-    def simulate_message_loss(self):
-        """Simulate message loss based on the given loss rate."""
-        return random.random() <= self.message_loss_rate
+    def simulate_message_loss(self, count):
+        """Simulate message loss of a broadcast to count nodes, True where a message is lost."""
+        return message_loss.sample_losses(self.rng, count, self.message_loss_rate)
+
+    def recipients(self, node):
+        """Nodes reached by a broadcast of node, every other node unless a topology limits the range."""
+        if self.topology is None:
+            return [other_node for other_node in self.nodes if other_node.id != node.id]
+        return [self.nodes[i] for i in self.topology.neighbours(node.id)]
+
+    def quorum(self, node):
+        """Messages node needs to advance its phase, a majority of the nodes it hears."""
+        if self.topology is None:
+            return self.total_nodes // 2 + 1
+        return (len(self.topology.neighbours(node.id)) + 1) // 2 + 1
+
+    def unreachable_quorums(self):
+        """Ids of the correct nodes whose quorum is larger than themselves and their correct neighbours."""
+        if self.topology is None:
+            correct = self.total_nodes - len(self.faulty_nodes)
+            if correct >= self.total_nodes // 2 + 1:
+                return set()
+            return {node.id for node in self.nodes if not node.faulty}
+        return {node.id for node in self.nodes if not node.faulty and self.quorum(node) > 1 + sum(
+            not self.nodes[i].faulty for i in self.topology.neighbours(node.id))}
 
     def broadcast_messages(self):
         """Simulate the broadcast of messages by all nodes."""
         messages = defaultdict(list)
         for node in self.nodes:
             if node.faulty:
-                print(f"Node {node.id} is crashed and does not participate.")
                 continue
             message = (node.id, node.value, node.phase)
-            for other_node in self.nodes:
-                if other_node.id != node.id and not self.simulate_message_loss():
+            other_nodes = self.recipients(node)
+            lost = self.simulate_message_loss(len(other_nodes))
+            for other_node, is_lost in zip(other_nodes, lost):
+                if not is_lost:
                     messages[other_node.id].append(message)
-            print(
-                f"Node {node.id} (Phase {node.phase}) broadcasts value {node.value}.")
+                elif tracing.level <= tracing.DEBUG:
+                    tracing.emit(tracing.MESSAGE_LOST,
+                                 node.id, other_node.id)
+            if tracing.level <= tracing.DEBUG:
+                tracing.emit(tracing.BROADCAST, node.id,
+                             node.value, node.phase)
         return messages
 
-    def run(self):
-        """Run the DAC algorithm and count the number of rounds to termination."""
+    def process_messages(self, node, received_messages):
+        """One round of a correct node: apply the messages it received and advance its phase on a quorum."""
+        if node.phase == self.pend:
+            # print(
+            #     f"Node {node.id} has reached pend and will not update its state.")
+            return  # Node will broadcast but not update its state or jump phases
+
+        # Messages from senders already recorded in R for this phase are visited
+        # first and the others next, each group in sender order. Entries kept from
+        # earlier rounds only carried the node's own value and phase, which never
+        # changes its state, so no per-round scan over all senders is needed.
+        accumulated_messages = [
+            message for message in received_messages if node.R.test(message[0])]
+        accumulated_messages += [
+            message for message in received_messages if not node.R.test(message[0])]
+        # print(
+        #     f"Node {node.id} (Phase {node.phase}) accumulated messages: {accumulated_messages}")
+
+        for sender_id, sender_value, sender_phase in accumulated_messages:
+            if sender_phase > node.phase:
+                # print(
+                #     f"Node {node.id} jumps to phase {sender_phase} (from Node {sender_id})")
+                node.value = sender_value
+                node.phase = sender_phase
+                node.reset_for_next_phase()  # Reset after jumping to the new phase
+                # break  "we need to check all the receive message even after we update the phase"
+            elif sender_phase == node.phase and not node.R.test(sender_id):
+                node.R.set(sender_id)
+                node.min_value = min(node.min_value, sender_value)
+                node.max_value = max(node.max_value, sender_value)
+
+        if node.R.count() >= self.quorum(node) and node.phase < self.pend:
+            # print(
+            #     f"Node {node.id} advances to phase {node.phase + 1}.")
+            node.update_value()
+            node.phase += 1
+            node.reset_for_next_phase()  # Reset only after advancing to the next phase
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.PHASE_ADVANCE,
+                             node.id, node.phase, node.value)
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """Run the DAC algorithm and count the number of rounds to termination, None past max_rounds."""
         rounds = 0  # Initialize round counter
 
         while True:
             rounds += 1  # Increment round count
-            print(f"\n--- Round {rounds} ---")
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.ROUND, rounds)
             # Check if all non-faulty nodes have reached the termination phase
             all_terminated = all(
-                node.phase == self.pend or node.faulty for node in self.nodes)
+                node.phase == self.pend or node.faulty or node.id in self.stranded for node in self.nodes)
             if all_terminated:
                 print(f"All nodes reached termination after {rounds} rounds.")
                 break
+            if rounds > max_rounds:
+                print(f"Nodes did not reach termination within {max_rounds} rounds.")
+                return None
 
             messages = self.broadcast_messages()
 
@@ -108,51 +220,13 @@ class DACAlgorithm:
                 if node.faulty:
                     continue  # Skip processing for faulty nodes
 
-                # Current round's received messages
-                received_messages = messages[node.id]
+                self.process_messages(node, messages[node.id])
 
-                # Create a dictionary to store unique messages per node, replacing old messages if a new one is received
-                unique_messages = {}
-
-                # Retain messages from previous rounds for the same phase
-                for sender_id in range(self.total_nodes):
-                    if node.R[sender_id] == 1 and sender_id != node.id:
-                        unique_messages[sender_id] = (
-                            sender_id, node.value, node.phase)
-
-                # Process new messages received in the current round and replace previous messages if received again
-                for sender_id, sender_value, sender_phase in received_messages:
-                    unique_messages[sender_id] = (
-                        sender_id, sender_value, sender_phase)
-
-                accumulated_messages = list(unique_messages.values())
-                # print(
-                #     f"Node {node.id} (Phase {node.phase}) accumulated messages: {accumulated_messages}")
-
-                if node.phase == self.pend:
-                    # print(
-                    #     f"Node {node.id} has reached pend and will not update its state.")
-                    continue  # Node will broadcast but not update its state or jump phases
-
-                for sender_id, sender_value, sender_phase in accumulated_messages:
-                    if sender_phase > node.phase:
-                        # print(
-                        #     f"Node {node.id} jumps to phase {sender_phase} (from Node {sender_id})")
-                        node.value = sender_value
-                        node.phase = sender_phase
-                        node.reset_for_next_phase()  # Reset after jumping to the new phase
-                        # break  "we need to check all the receive message even after we update the phase"
-                    elif sender_phase == node.phase and node.R[sender_id] == 0:
-                        node.R[sender_id] = 1
-                        node.min_value = min(node.min_value, sender_value)
-                        node.max_value = max(node.max_value, sender_value)
-
-                if sum(node.R) >= (self.total_nodes // 2) + 1 and node.phase < self.pend:
-                    # print(
-                    #     f"Node {node.id} advances to phase {node.phase + 1}.")
-                    node.update_value()
-                    node.phase += 1
-                    node.reset_for_next_phase()  # Reset only after advancing to the next phase
+            if self.mobility is not None:
+                # Nodes move before the next round, only crossing nodes are re-bucketed
+                self.neighbour_changes = self.topology.move(
+                    self.mobility.step())
+                self.stranded = self.unreachable_quorums()
         return rounds
 
     def print_final_values(self):
@@ -194,18 +268,30 @@ if __name__ == "__main__":
 
     ]
 
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
     results = []  # This will store results for the JSON file
 
     for config in configurations:
         for _ in range(num_runs):
+            seed = next(seeds)
             print(f"\nRunning DAC with configuration: {config}")
-            dac = DACAlgorithm(
-                total_nodes=config['N'],
-                num_faulty_nodes=config['f'],
-                message_loss_rate=config['message_loss_rate'],
-                initial_ratio=config['initial_ratio'],
-                epsilon=config['epsilon']
-            )
+            try:
+                dac = DACAlgorithm(
+                    total_nodes=config['N'],
+                    num_faulty_nodes=config['f'],
+                    message_loss_rate=config['message_loss_rate'],
+                    initial_ratio=config['initial_ratio'],
+                    epsilon=config['epsilon'],
+                    rng=seeding.make_rng(seed)
+                )
+            except ValueError as error:
+                # Quorums out of reach, the same for every run of the configuration
+                print(f"Skipping configuration {config}: {error}")
+                break
             rounds = dac.run()
             dac.print_final_values()
 
@@ -214,7 +300,8 @@ if __name__ == "__main__":
                 'config': config,
                 'rounds': rounds,
                 'num_nodes': config['N'],
-                'message_loss_rate': config['message_loss_rate']
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
             }
             results.append(result)
 
@@ -1,6 +1,14 @@
 import random
 import math
 import json
+import heapq
+import numpy as np
+
+import adversary
+from adversary import OMITTING as omitting_strategies
+import seeding
+import tracing
+from node_store import store_backed
 
 
 def calculate_p_end(n, epsilon):
@@ -8,137 +16,257 @@ def calculate_p_end(n, epsilon):
    # return math.ceil(math.log(epsilon) / math.log(1 - 2 ** -n))
 
 
+class ByzantinePayload:
+    """Broadcast of a Byzantine node in one round.
+
+    Recipients query it for their value when they accept the message, so lost
+    and ignored messages cost no random draws.
+    """
+
+    def __init__(self, sender, strategy):
+        self.sender = sender
+        self.strategy = strategy  # Strategy the sender picked for this round
+
+    def value_for(self, recipient):
+        """Value the sender sends to recipient."""
+        if self.strategy == self.sender.byzantine_strategy_1:
+            return self.strategy()
+        return self.strategy(recipient.phase)
+
+
+class AdversaryPayload:
+    """Broadcast of a Byzantine node in one round, a column of an adversary payload matrix."""
+
+    def __init__(self, values):
+        self.values = values  # Value for every recipient id, NaN when nothing is sent
+
+    def value_for(self, recipient):
+        """Value the sender sends to recipient, None when it sends nothing."""
+        value = self.values[recipient.node_id]
+        return None if math.isnan(value) else float(value)
+
+
 class Node:
-    def __init__(self, node_id, is_byzantine=False):
+    __slots__ = ('node_id', 'rng', 'vi', 'phase', 'is_byzantine', 'Ri', 'Ri_low',
+                 'Ri_high', 'buffer', 'inbox')
+
+    def __init__(self, node_id, is_byzantine=False, rng=random):
         self.node_id = node_id
-        self.vi = random.uniform(0, 1)
+        self.rng = rng  # Generator of the run the node belongs to
+        self.vi = self.rng.uniform(0, 1)
         self.phase = 0
         self.is_byzantine = is_byzantine
-        self.Ri = [0] * n
-        self.Ri[node_id] = 1  # Mark self as received (including self-message)
-        self.Ri_low = []
-        self.Ri_high = []
+        self.Ri = {node_id}  # Senders received this phase, including self-message
+        self.Ri_low = []  # Max-heap (negated values) of the f + 1 smallest values received
+        self.Ri_high = []  # Min-heap of the f + 1 largest values received
         self.buffer = {}  # Buffer to store latest messages for each phase
-        self.received_messages = []  # To store received messages for printing
+        # Latest message of each sender this round, in arrival order
+        self.inbox = {}
+
+    @property
+    def received_messages(self):
+        """Messages received this round as (sender_id, phase, value), one per sender."""
+        return list(self.inbox.values())
 
     def byzantine_strategy_1(self):
         """Strategy 1: Send a unique random value to each recipient."""
-        return random.uniform(0, 1)
+        return self.rng.uniform(0, 1)
 
     def byzantine_strategy_2(self, recipient_phase):
         """Strategy 2: Send high values for higher-phase nodes, low values for lower-phase nodes."""
         if recipient_phase > self.phase:
             # High value for nodes with higher phases
-            return random.uniform(0.75, 1)
+            return self.rng.uniform(0.75, 1)
         else:
             # Low value for nodes with lower phases
-            return random.uniform(0, 0.25)
+            return self.rng.uniform(0, 0.25)
 
     def broadcast(self, nodes):
 
         if self.is_byzantine:
-            # Randomly select one strategy for the entire broadcast round
-            chosen_strategy = random.choice(
+            # Randomly select one strategy for the entire broadcast round, the
+            # value of each recipient is drawn when it receives the message
+            chosen_strategy = self.rng.choice(
                 [self.byzantine_strategy_1, self.byzantine_strategy_2]
             )
-            print(
-                f"Byzantine Node {self.node_id} chose {'Strategy 1' if chosen_strategy == self.byzantine_strategy_1 else 'Strategy 2'}")
-
-            broadcast_value = {}
-
-            for node in nodes:
-                if node.node_id == self.node_id:
-                    continue  # Skip sending a message to itself
-
-                # Use the chosen strategy for all recipients in this round
-                if chosen_strategy == self.byzantine_strategy_1:
-                    broadcast_value[node.node_id] = self.byzantine_strategy_1()
-                else:
-                    broadcast_value[node.node_id] = self.byzantine_strategy_2(
-                        node.phase)
-
-            print(
-                f"Byzantine Node {self.node_id} (Phase {self.phase}) broadcasting inconsistent values: {broadcast_value}"
-            )
-            return self.node_id, broadcast_value, self.phase
+            return self.node_id, ByzantinePayload(self, chosen_strategy), self.phase
 
         else:
             # Normal node broadcasts its value consistently
             broadcast_value = self.vi
-            print(
-                f"Node {self.node_id} (Phase {self.phase}) broadcasting: {broadcast_value:.4f}"
-            )
+            if tracing.level <= tracing.DEBUG:
+                tracing.emit(tracing.BROADCAST, self.node_id,
+                             broadcast_value, self.phase)
             return self.node_id, broadcast_value, self.phase
 
     def receive_message(self, sender_id, value, phase, message_loss_rate):
         # Simulate message loss for each received message
-        if random.random() < message_loss_rate:
-            print(f"Node {self.node_id} lost message from Node {sender_id}.")
+        if self.rng.random() < message_loss_rate:
+            if tracing.level <= tracing.DEBUG:
+                tracing.emit(tracing.MESSAGE_LOST, sender_id, self.node_id)
             return  # Simulate lost message by returning early
+        self.accept_message(sender_id, value, phase)
 
-        # Handle inconsistent values from Byzantine nodes
-        received_value = value if not isinstance(
-            value, dict) else value.get(self.node_id, random.uniform(0, 1))
-
+    def accept_message(self, sender_id, value, phase):
+        """Apply a delivered message, without drawing its loss."""
         # Check if the message meets the required condition
-        if self.phase < p_end and phase >= self.phase and self.Ri[sender_id] == 0:
-            self.Ri[sender_id] = 1  # Mark sender as received
+        if self.phase < p_end and phase >= self.phase and sender_id not in self.Ri:
+            # Handle inconsistent values from Byzantine nodes
+            if isinstance(value, (ByzantinePayload, AdversaryPayload)):
+                received_value = value.value_for(self)
+                if received_value is None:
+                    return  # The Byzantine sender omitted this message
+                if tracing.level <= tracing.DEBUG:
+                    tracing.emit(tracing.MESSAGE_SENT, sender_id,
+                                 self.node_id, received_value, phase)
+            else:
+                received_value = value
+            self.Ri.add(sender_id)  # Mark sender as received
             self.STORE(received_value)
 
-            self.received_messages = [(s_id, p, v) for (
-                s_id, p, v) in self.received_messages if s_id != sender_id]
-            self.received_messages.append((sender_id, phase, received_value))
+            # Replace any earlier message of the sender and move it to the end
+            self.inbox.pop(sender_id, None)
+            self.inbox[sender_id] = (sender_id, phase, received_value)
             # print(f"Node {self.node_id} received from Node {sender_id} - Phase {phase}, Value {received_value:.4f}")
 
     def STORE(self, value):
+        """Keep the f + 1 smallest and the f + 1 largest received values, O(log f) per value."""
         if len(self.Ri_low) < f + 1:
-            self.Ri_low.append(value)
-        elif value < max(self.Ri_low):
-            self.Ri_low[self.Ri_low.index(max(self.Ri_low))] = value
+            heapq.heappush(self.Ri_low, -value)
+        elif value < -self.Ri_low[0]:
+            heapq.heapreplace(self.Ri_low, -value)
 
         if len(self.Ri_high) < f + 1:
-            self.Ri_high.append(value)
-        elif value > min(self.Ri_high):
-            self.Ri_high[self.Ri_high.index(min(self.Ri_high))] = value
+            heapq.heappush(self.Ri_high, value)
+        elif value > self.Ri_high[0]:
+            heapq.heapreplace(self.Ri_high, value)
+
+    def trimmed_low(self):
+        """Largest of the f + 1 smallest values received."""
+        return -self.Ri_low[0]
+
+    def trimmed_high(self):
+        """Smallest of the f + 1 largest values received."""
+        return self.Ri_high[0]
 
     def count_received_messages(self):
-        self.Ri[self.node_id] = 1  # Count self-message
-        return sum(self.Ri)
+        return len(self.Ri)  # Self-message is always in Ri
 
     def reset_after_phase_increment(self):
-        self.Ri = [0] * n
-        self.Ri[self.node_id] = 1  # Mark itself as received
+        self.Ri = {self.node_id}  # Mark itself as received
         self.buffer = {}
         self.Ri_low = []
         self.Ri_high = []
-        self.received_messages = []
+        self.inbox = {}
+
+
+# Rounds after which run() stops and reports the run as non-terminating
+MAX_ROUNDS = 1000
+
+# Scalar fields of a Node kept in a node_store.NodeStore when the algorithm runs with store=True
+STORED_FIELDS = {'vi': 'd', 'phase': 'q', 'is_byzantine': 'b'}
 
 
 class DBACAlgorithm:
-    def __init__(self, total_nodes, faulty_nodes, message_loss_rate, epsilon):
+    def __init__(self, total_nodes, faulty_nodes, message_loss_rate, epsilon, rng=None, topology=None,
+                 adversary=None, store=False):
         global n, f, p_end
         n = total_nodes
         f = faulty_nodes
         p_end = calculate_p_end(n, epsilon)
         self.message_loss_rate = message_loss_rate
-        self.nodes = [Node(node_id, is_byzantine=(node_id < f))
+        # Generator of this run, the global random module unless a seeded one is given
+        self.rng = random if rng is None else rng
+        # Node class of the run, with store=True one keeping STORED_FIELDS in its node_store.NodeStore
+        self.node_class = store_backed(
+            Node, n, 'node_id', STORED_FIELDS) if store else Node
+        self.nodes = [self.node_class(node_id, is_byzantine=(node_id < f), rng=self.rng)
                       for node_id in range(n)]
         self.round_counter = 0
+        # Optional topology.GridTopology limiting broadcasts to radio range, all-to-all if None.
+        # With a topology f bounds the Byzantine nodes in every neighbourhood.
+        self.topology = topology
+        # Optional adversary.STRATEGIES name replacing the strategies of the Byzantine nodes
+        self.adversary = adversary
+        if adversary is not None:
+            self.adversary_rng = np.random.default_rng(
+                self.rng.getrandbits(63))
+        unreachable = self.unreachable_quorums()
+        if unreachable:
+            omitting = " with the Byzantine nodes omitting their messages" \
+                if adversary in omitting_strategies else ""
+            raise ValueError(
+                f"{len(unreachable)} nodes, e.g. node {min(unreachable)}, hear fewer nodes than their quorum"
+                f"{omitting} and can never advance")
         # self.total_byzantine = faulty_nodes
 
-    def run(self):
-        """Runs the DBAC algorithm until all nodes reach p_end."""
+    def neighbours(self, node):
+        """Nodes node hears from and broadcasts to, every node unless a topology limits the range."""
+        if self.topology is None:
+            return self.nodes
+        return [self.nodes[i] for i in self.topology.neighbours(node.node_id)]
+
+    def quorum(self, node):
+        """Messages node needs to advance its phase."""
+        if self.topology is None:
+            return (n + 3 * f) // 2 + 1
+        return (len(self.topology.neighbours(node.node_id)) + 1 + 3 * f) // 2 + 1
+
+    def unreachable_quorums(self):
+        """Ids of the nodes whose quorum is larger than themselves and their neighbours.
+
+        The quorum also needs one message besides the node's own, the trimmed
+        values only come from received messages. Byzantine senders are not
+        heard when the adversary strategy omits messages.
+        """
+        omitting = self.adversary in omitting_strategies
+        unreachable = set()
+        for node in self.nodes:
+            # The node itself and the nodes it hears
+            if self.topology is None:
+                heard = n - (f - node.is_byzantine if omitting else 0)
+            else:
+                heard = 1 + sum(not (omitting and i < f)
+                                for i in self.topology.neighbours(node.node_id))
+            if not 2 <= self.quorum(node) <= heard:
+                unreachable.add(node.node_id)
+        return unreachable
+
+    def adversary_messages(self):
+        """Messages of the Byzantine nodes this round, filled by the adversary strategy."""
+        phases = [node.phase for node in self.nodes]
+        values = adversary.payload(self.adversary, self.adversary_rng, phases,
+                                   [node.vi for node in self.nodes], phases[:f])
+        return [(node.node_id, AdversaryPayload(values[:, node.node_id]), node.phase)
+                for node in self.nodes[:f]]
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """Runs the DBAC algorithm until all nodes reach p_end, None if they did not within max_rounds."""
         termination = False
         while not termination:
+            if self.round_counter >= max_rounds:
+                print(f"Nodes did not reach p_end within {max_rounds} rounds.")
+                return None
             self.round_counter += 1
-            print(f"\n--- Round {self.round_counter} ---")
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.ROUND, self.round_counter)
 
             # Each node broadcasts its current value
-            messages = [node.broadcast(self.nodes) for node in self.nodes]
+            if self.adversary is None:
+                messages = [node.broadcast(self.neighbours(node))
+                            for node in self.nodes]
+            else:
+                messages = self.adversary_messages() + [
+                    node.broadcast(self.neighbours(node)) for node in self.nodes[f:]]
 
             for node in self.nodes:
-                node.received_messages = []
-                for sender_id, value, phase in messages:
+                node.inbox.clear()
+                if self.topology is None:
+                    incoming = messages
+                else:
+                    incoming = [messages[sender.node_id]
+                                for sender in self.neighbours(node)]
+                for sender_id, value, phase in incoming:
                     if sender_id != node.node_id:
                         node.receive_message(
                             sender_id, value, phase, self.message_loss_rate)
@@ -147,22 +275,18 @@ class DBACAlgorithm:
             # Check phase update condition for each node
             for node in self.nodes:
                 if node.phase == p_end:
-                    print(
-                        f"Node {node.node_id} has reached termination phase {p_end}.")
                     continue  # Node reached final phase, only broadcasts
 
                 received_count = node.count_received_messages()
                 # print(f"Node {node.node_id} count messages: {received_count}")
-                if received_count >= (n + 3 * f) // 2 + 1:
-                    node.vi = (max(node.Ri_low) + min(node.Ri_high)) / 2
+                if received_count >= self.quorum(node):
+                    node.vi = (node.trimmed_low() + node.trimmed_high()) / 2
                     node.phase += 1
                     # print(f"Node {node.node_id} Ri_low: {node.Ri_low}, Ri_high: {node.Ri_high}")
-                    print(
-                        f"Node {node.node_id} updated to new phase {node.phase} with vi = {node.vi:.4f}")
+                    if tracing.level <= tracing.INFO:
+                        tracing.emit(tracing.PHASE_ADVANCE,
+                                     node.node_id, node.phase, node.vi)
                     node.reset_after_phase_increment()
-                else:
-                    print(
-                        f"Node {node.node_id} did not receive enough messages to update Phase {node.phase}.")
 
             termination = all(node.phase == p_end for node in self.nodes)
 
@@ -199,17 +323,29 @@ if __name__ == "__main__":
 
     ]
 
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
     results = []  # Store results for JSON
 
     for config in configurations:
         for _ in range(num_runs):
+            seed = next(seeds)
             print(f"\nRunning DBAC with configuration: {config}")
-            dbac = DBACAlgorithm(
-                total_nodes=config['N'],
-                faulty_nodes=config['f'],
-                message_loss_rate=config['message_loss_rate'],
-                epsilon=config['epsilon']
-            )
+            try:
+                dbac = DBACAlgorithm(
+                    total_nodes=config['N'],
+                    faulty_nodes=config['f'],
+                    message_loss_rate=config['message_loss_rate'],
+                    epsilon=config['epsilon'],
+                    rng=seeding.make_rng(seed)
+                )
+            except ValueError as error:
+                # Quorums out of reach, the same for every run of the configuration
+                print(f"Skipping configuration {config}: {error}")
+                break
             rounds = dbac.run()
             dbac.print_final_values()
 
@@ -218,7 +354,8 @@ if __name__ == "__main__":
                 'config': config,
                 'rounds': rounds,
                 'num_nodes': config['N'],
-                'message_loss_rate': config['message_loss_rate']
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
             }
             results.append(result)
 
@@ -3,6 +3,12 @@ import math
 import json
 from collections import defaultdict
 
+import message_loss
+import seeding
+import tracing
+from bitset import BitVector
+from node_store import store_backed
+
 # Calculate pend
 
 
@@ -11,62 +17,78 @@ def calculate_pend(epsilon):
 
 
 class Node:
+    __slots__ = ('id', 'phase', 'value', 'R', 'total_nodes', 'f', 'faulty')
+
     def __init__(self, id, initial_value, total_nodes, f):
         self.id = id
         self.phase = 0
         self.value = initial_value
-        # Bit vector tracking received messages (0 means no message received, 1 means received)
-        self.R = [0] * total_nodes
-        self.R[self.id] = 1  # Mark itself as received
+        # Bit vector tracking received messages, marking itself as received
+        self.R = BitVector.single(self.id)
         self.total_nodes = total_nodes
         self.f = f  # Number of faulty nodes
         self.faulty = False  # Node is non-faulty by default
 
     def reset_for_next_phase(self):
         """Reset the received message bit vector (R) after advancing to the next phase."""
-        self.R = [0] * self.total_nodes
-        self.R[self.id] = 1  # Mark itself as received again for the new phase
+        self.R.reset(self.id)  # Mark itself as received again for the new phase
+
+
+# Scalar fields of a Node kept in a node_store.NodeStore when the algorithm runs with store=True
+STORED_FIELDS = {'phase': 'q', 'value': 'd', 'faulty': 'b'}
 
 
 class EarlyDACAlgorithm:
-    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon):
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon, rng=None,
+                 store=False):
         self.total_nodes = total_nodes
+        # Generator of this run, the global random module unless a seeded one is given
+        self.rng = random if rng is None else rng
         self.message_loss_rate = message_loss_rate
         self.pend = calculate_pend(epsilon)
+        # Node class of the run, with store=True one keeping STORED_FIELDS in its node_store.NodeStore
+        self.node_class = store_backed(
+            Node, total_nodes, 'id', STORED_FIELDS) if store else Node
         self.nodes = []
-        self.faulty_nodes = random.sample(range(total_nodes), num_faulty_nodes)
+        self.faulty_nodes = self.rng.sample(range(total_nodes), num_faulty_nodes)
         self.initialize_nodes(initial_ratio, num_faulty_nodes)
 
     def initialize_nodes(self, ratio, f):
         """Initialize the nodes with binary values based on the input ratio."""
         num_ones = int(self.total_nodes * ratio)
         values = [1] * num_ones + [0] * (self.total_nodes - num_ones)
-        random.shuffle(values)
+        self.rng.shuffle(values)
 
         # Assign values to the nodes
         for i in range(self.total_nodes):
-            node = Node(i, values[i], self.total_nodes, f)
+            node = self.node_class(i, values[i], self.total_nodes, f)
             if i in self.faulty_nodes:
                 node.faulty = True
             self.nodes.append(node)
 
-    def simulate_message_loss(self):
-        """Simulate message loss based on the given loss rate."""
-        return random.random() <= self.message_loss_rate
+    def simulate_message_loss(self, count):
+        """Simulate message loss of a broadcast to count nodes, True where a message is lost."""
+        return message_loss.sample_losses(self.rng, count, self.message_loss_rate)
 
     def broadcast_messages(self):
         """Simulate the broadcast of messages by all nodes."""
         messages = defaultdict(list)
         for node in self.nodes:
             if node.faulty:
-                print(f"Node {node.id} is faulty and does not broadcast.")
                 continue
             message = (node.id, node.value, node.phase)
-            print(
-                f"Node {node.id} broadcasts: Value = {node.value}, Phase = {node.phase}")
-            for other_node in self.nodes:
-                if other_node.id != node.id and not self.simulate_message_loss():
+            if tracing.level <= tracing.DEBUG:
+                tracing.emit(tracing.BROADCAST, node.id,
+                             node.value, node.phase)
+            lost = self.simulate_message_loss(self.total_nodes - 1)
+            other_nodes = (
+                other_node for other_node in self.nodes if other_node.id != node.id)
+            for other_node, is_lost in zip(other_nodes, lost):
+                if not is_lost:
                     messages[other_node.id].append(message)
+                elif tracing.level <= tracing.DEBUG:
+                    tracing.emit(tracing.MESSAGE_LOST,
+                                 node.id, other_node.id)
         return messages
 
     def run(self):
@@ -74,8 +96,9 @@ class EarlyDACAlgorithm:
         rounds = 0
 
         while True:
-            print(f"\n--- Round {rounds + 1} ---")  # Print each round
             rounds += 1
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.ROUND, rounds)
             all_terminated = all(
                 node.phase == self.pend or node.faulty for node in self.nodes)
             if all_terminated:
@@ -88,14 +111,16 @@ class EarlyDACAlgorithm:
                     continue
 
                 received_messages = messages[node.id]
-                print(f"Node {node.id} received messages: {received_messages}")
+                if tracing.level <= tracing.DEBUG:
+                    for sender_id, vj, pj in received_messages:
+                        tracing.emit(tracing.MESSAGE_RECEIVED,
+                                     node.id, sender_id, vj, pj)
                 if received_messages:
                     min_value = min(vj for _, vj, _ in received_messages)
                     max_value = max(vj for _, vj, _ in received_messages)
                 else:
                     min_value = None
                     max_value = None
-                print(f"min value: {min_value} and max_value: {max_value}")
 
                 if node.phase == self.pend:
                     # print(
@@ -105,49 +130,42 @@ class EarlyDACAlgorithm:
                 # Only mark messages as received here, do not calculate min and max yet
                 for sender_id, vj, pj in received_messages:
                     if pj > node.phase:
-                        print(
-                            f"Node {node.id} jumps to Phase {pj} with Value {vj} from Node {sender_id}")
                         node.value = vj
                         node.phase = pj
                         node.reset_for_next_phase()
-                    elif pj == node.phase and node.R[sender_id] == 0:
+                        if tracing.level <= tracing.INFO:
+                            tracing.emit(tracing.PHASE_ADVANCE,
+                                         node.id, node.phase, node.value)
+                    elif pj == node.phase and not node.R.test(sender_id):
                         # Mark that we received a message from this node
-                        node.R[sender_id] = 1
+                        node.R.set(sender_id)
 
                         # evaluate conditions based on the number of identical values
-                        if sum(node.R) >= 2 * node.f + 1:
+                        if node.R.count() >= 2 * node.f + 1:
 
                             identical_values = [
                                 vj for _, vj, _ in received_messages if pj == node.phase]
-                            print(f"identical values:{identical_values}")
-                            print(
-                                f"Node {node.id} identical values count: {len(identical_values)}")
 
                             # Check if there are 2f + 1 identical values
                             if len(identical_values) >= 2 * node.f + 1:
-
-                                print(
-                                    f"lenght of identical value:{len(identical_values)}")
-                                print(
-                                    f"Node {node.id} enters Early-Stopping with Value {identical_values[0]}")
                                 # Set to the identical value
                                 node.value = identical_values[0]
                                 node.phase = self.pend  # Early-stopping
+                                if tracing.level <= tracing.INFO:
+                                    tracing.emit(tracing.EARLY_STOP,
+                                                 node.id, node.value)
                             elif len(identical_values) >= node.f + 1:
-                                print(
-                                    f"lenght of identical value:{len(identical_values)}")
-                                print(
-                                    f"Node {node.id} updates Value to {identical_values[0]} and advances to Phase {node.phase + 1}")
                                 node.value = identical_values[0]
                                 node.phase += 1
                             else:
                                 # Calculate min and max from all received messages for fallback condition
 
                                 new_value = (min_value + max_value) / 2
-                                print(
-                                    f"Node {node.id} updates Value to {new_value} when we have (min: {min_value}, max: {max_value}) and advances to Phase {node.phase + 1}")
                                 node.value = new_value
                                 node.phase += 1
+                            if tracing.level <= tracing.INFO:
+                                tracing.emit(tracing.PHASE_ADVANCE,
+                                             node.id, node.phase, node.value)
                             node.reset_for_next_phase()
         return rounds
 
@@ -170,16 +188,23 @@ if __name__ == "__main__":
         {'N': 50, 'f': 15, 'message_loss_rate': 0.3,
             'initial_ratio': 0.2, 'epsilon': 0.001}
     ]
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
     results = []
     for config in configurations:
         for _ in range(num_runs):
+            seed = next(seeds)
             print(f"\nRunning Early-DAC with configuration: {config}")
             edac = EarlyDACAlgorithm(
                 total_nodes=config['N'],
                 num_faulty_nodes=config['f'],
                 message_loss_rate=config['message_loss_rate'],
                 initial_ratio=config['initial_ratio'],
-                epsilon=config['epsilon']
+                epsilon=config['epsilon'],
+                rng=seeding.make_rng(seed)
             )
             rounds = edac.run()
             print(f"Total Rounds: {rounds}")
@@ -189,7 +214,8 @@ if __name__ == "__main__":
                 'config': config,
                 'rounds': rounds,
                 'num_nodes': config['N'],
-                'message_loss_rate': config['message_loss_rate']
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
             }
             results.append(result)
 
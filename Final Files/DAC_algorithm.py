@@ -111,21 +111,14 @@ class DACAlgorithm:
                 # Current round's received messages
                 received_messages = messages[node.id]
 
-                # Create a dictionary to store unique messages per node, replacing old messages if a new one is received
-                unique_messages = {}
-
-                # Retain messages from previous rounds for the same phase
-                for sender_id in range(self.total_nodes):
-                    if node.R[sender_id] == 1 and sender_id != node.id:
-                        unique_messages[sender_id] = (
-                            sender_id, node.value, node.phase)
-
-                # Process new messages received in the current round and replace previous messages if received again
-                for sender_id, sender_value, sender_phase in received_messages:
-                    unique_messages[sender_id] = (
-                        sender_id, sender_value, sender_phase)
-
-                accumulated_messages = list(unique_messages.values())
+                # Messages from senders already recorded in R for this phase are visited
+                # first and the others next, each group in sender order. Entries kept from
+                # earlier rounds only carried the node's own value and phase, which never
+                # changes its state, so no per-round scan over all senders is needed.
+                accumulated_messages = [
+                    message for message in received_messages if node.R[message[0]]]
+                accumulated_messages += [
+                    message for message in received_messages if not node.R[message[0]]]
                 # print(
                 #     f"Node {node.id} (Phase {node.phase}) accumulated messages: {accumulated_messages}")
 
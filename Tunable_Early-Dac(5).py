@@ -3,6 +3,10 @@ import math
 import json
 from collections import defaultdict
 
+import message_loss
+import seeding
+from bitset import BitVector
+
 # Calculate pend
 
 
@@ -11,15 +15,19 @@ def calculate_pend(epsilon):
 
 
 class Node:
+    __slots__ = ('id', 'phase', 'value', 'min_value', 'max_value', 'R', 'set',
+                 'total_nodes', 'faulty')
+
     def __init__(self, id, initial_value, total_nodes):
         self.id = id
         self.phase = 0
         self.value = initial_value
         self.min_value = initial_value
         self.max_value = initial_value
-        self.R = [0] * total_nodes  # Bit vector tracking received messages
-        self.R[self.id] = 1  # Mark itself as received
-        self.set = [0] * total_nodes  # set of received value
+        # Bit vector tracking received messages, marking itself as received
+        self.R = BitVector.single(self.id)
+        # set of received values by sender, the node's own entry starts at 0
+        self.set = {self.id: 0}
         self.total_nodes = total_nodes
         self.faulty = False  # Node is non-faulty by default
 
@@ -27,11 +35,9 @@ class Node:
         """Reset values related to state and the received message bit vector (R) after advancing to the next phase."""
         self.min_value = self.value
         self.max_value = self.value
-        # Reset the bit vector for the new phase
-        self.R = [0] * self.total_nodes
-        self.R[self.id] = 1  # Mark itself as received again for the new phase
-        self.set = [0] * self.total_nodes
-        self.set[self.id] = self.value
+        # Reset the bit vector for the new phase, marking itself as received again
+        self.R.reset(self.id)
+        self.set = {self.id: self.value}
 
     def update_value(self):
         """Update the node's value based on the min and max values received."""
@@ -48,13 +54,15 @@ class Node:
 
 
 class DACAlgorithm:
-    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon):
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon, rng=None):
         self.total_nodes = total_nodes
+        # Generator of this run, the global random module unless a seeded one is given
+        self.rng = random if rng is None else rng
         self.message_loss_rate = message_loss_rate
         self.pend = calculate_pend(epsilon)
         self.nodes = []
         self.num_faulty_nodes = num_faulty_nodes
-        self.faulty_nodes = random.sample(range(total_nodes), num_faulty_nodes)
+        self.faulty_nodes = self.rng.sample(range(total_nodes), num_faulty_nodes)
         self.initialize_nodes(initial_ratio)
         self.epsilon = epsilon
 
@@ -64,7 +72,7 @@ class DACAlgorithm:
                        ratio)
         num_zeros = self.total_nodes - num_ones   # The rest will have value 0
         values = [1] * num_ones + [0] * num_zeros
-        random.shuffle(values)
+        self.rng.shuffle(values)
 
         # Assign the values to the nodes
         for i in range(self.total_nodes):
@@ -73,9 +81,9 @@ class DACAlgorithm:
                 node.faulty = True
             self.nodes.append(node)
 
-    def simulate_message_loss(self):
-        """Simulate message loss based on the given loss rate."""
-        return random.random() <= self.message_loss_rate
+    def simulate_message_loss(self, count):
+        """Simulate message loss of a broadcast to count nodes, True where a message is lost."""
+        return message_loss.sample_losses(self.rng, count, self.message_loss_rate)
 
     def broadcast_messages(self):
         """Simulate the broadcast of messages by all nodes."""
@@ -85,8 +93,11 @@ class DACAlgorithm:
                 # print(f"Node {node.id} is crashed and does not participate.")
                 continue
             message = (node.id, node.value, node.phase)
-            for other_node in self.nodes:
-                if other_node.id != node.id and not self.simulate_message_loss():
+            lost = self.simulate_message_loss(self.total_nodes - 1)
+            other_nodes = (
+                other_node for other_node in self.nodes if other_node.id != node.id)
+            for other_node, is_lost in zip(other_nodes, lost):
+                if not is_lost:
                     messages[other_node.id].append(message)
             # print(
             #     f"Node {node.id} (Phase {node.phase}) broadcasts value {node.value}.")
@@ -116,21 +127,14 @@ class DACAlgorithm:
                 # Current round's received messages
                 received_messages = messages[node.id]
 
-                # Create a dictionary to store unique messages per node, replacing old messages if a new one is received
-                unique_messages = {}
-
-                # Retain messages from previous rounds for the same phase
-                for sender_id in range(self.total_nodes):
-                    if node.R[sender_id] == 1 and sender_id != node.id:
-                        unique_messages[sender_id] = (
-                            sender_id, node.value, node.phase)
-
-                # Process new messages received in the current round and replace previous messages if received again
-                for sender_id, sender_value, sender_phase in received_messages:
-                    unique_messages[sender_id] = (
-                        sender_id, sender_value, sender_phase)
-
-                accumulated_messages = list(unique_messages.values())
+                # Messages from senders already recorded in R for this phase are visited
+                # first and the others next, each group in sender order. Entries kept from
+                # earlier rounds only carried the node's own value and phase, which never
+                # changes its state, so no per-round scan over all senders is needed.
+                accumulated_messages = [
+                    message for message in received_messages if node.R.test(message[0])]
+                accumulated_messages += [
+                    message for message in received_messages if not node.R.test(message[0])]
                 # print(
                 #     f"Node {node.id} (Phase {node.phase}) accumulated messages: {accumulated_messages}")
 
@@ -147,8 +151,8 @@ class DACAlgorithm:
                         node.phase = sender_phase
                         node.reset_for_next_phase()  # Reset after jumping to the new phase
                         # break  "we need to check all the receive message even after we update the phase"
-                    elif sender_phase == node.phase and node.R[sender_id] == 0:
-                        node.R[sender_id] = 1
+                    elif sender_phase == node.phase and not node.R.test(sender_id):
+                        node.R.set(sender_id)
                         node.set[sender_id] = sender_value
                         node.min_value = min(node.min_value, sender_value)
                         node.max_value = max(node.max_value, sender_value)
@@ -158,15 +162,11 @@ class DACAlgorithm:
 
                 else:
                     # print("here")
-                    if sum(node.R) >= (self.total_nodes-self.num_faulty_nodes) and node.phase < self.pend:
+                    if node.R.count() >= (self.total_nodes-self.num_faulty_nodes) and node.phase < self.pend:
                         # print(
                         #     f"Node {node.id} advances to phase {node.phase + 1}.")
 
-                        values = []
-
-                        for i in range(0, node.total_nodes):
-                            if node.R[i] == 1:
-                                values.append(node.set[i])
+                        values = [node.set[i] for i in node.R.indices()]
 
                         maxValue = max(values)
                         minValue = min(values)
@@ -267,17 +267,24 @@ if __name__ == "__main__":
 
     ]
 
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
     results = []  # This will store results for the JSON file
 
     for config in configurations:
         for _ in range(num_runs):
+            seed = next(seeds)
             print(f"\nRunning DAC with configuration: {config}")
             dac = DACAlgorithm(
                 total_nodes=config['N'],
                 num_faulty_nodes=config['f'],
                 message_loss_rate=config['message_loss_rate'],
                 initial_ratio=config['initial_ratio'],
-                epsilon=config['epsilon']
+                epsilon=config['epsilon'],
+                rng=seeding.make_rng(seed)
             )
             rounds = dac.run()
             # dac.print_final_values()
@@ -288,7 +295,8 @@ if __name__ == "__main__":
                 'rounds': rounds,
                 'num_nodes': config['N'],
                 'message_loss_rate': config['message_loss_rate'],
-                'initial ratio': config['initial_ratio']
+                'initial ratio': config['initial_ratio'],
+                'seed': seed
             }
             results.append(result)
 
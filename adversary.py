@@ -0,0 +1,109 @@
+"""Byzantine adversary strategies shared by the simulators.
+
+A strategy fills the values the Byzantine senders send in one round as a
+payload matrix indexed [..., recipient, sender], in one call. It gets:
+
+    rng              NumPy generator of the run
+    recipient_phase  phase of every recipient, shape (..., n), zeros without phases
+    recipient_value  current value of every recipient, shape (..., n)
+    sender_phase     phase of every Byzantine sender, shape (..., b)
+    binary           send only 0 or 1, like the Byzantine vehicles of vehicles.py
+
+Leading axes are replicas of a batched engine. NaN entries are omitted messages,
+the recipient gets nothing from that sender. Strategies are registered by name
+in STRATEGIES, payload() looks them up. The ones that omit messages are also in
+OMITTING, the simulators with a quorum check that the correct senders alone can
+fill it.
+"""
+import numpy as np
+
+STRATEGIES = {}
+# Names of the strategies whose payloads omit messages
+OMITTING = set()
+
+
+def register(name, omits=False):
+    """Register the decorated function as the strategy called name, omits when it sends NaN entries."""
+    def add(strategy):
+        STRATEGIES[name] = strategy
+        if omits:
+            OMITTING.add(name)
+        return strategy
+    return add
+
+
+def payload(name, rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """Payload matrix of the Byzantine senders for one round with the named strategy."""
+    if name not in STRATEGIES:
+        raise ValueError(
+            f"Unknown adversary strategy {name!r}, expected one of {sorted(STRATEGIES)}")
+    return STRATEGIES[name](rng, np.asarray(recipient_phase), np.asarray(recipient_value),
+                            np.asarray(sender_phase), binary)
+
+
+def _shape(recipient_phase, sender_phase):
+    return recipient_phase.shape + sender_phase.shape[-1:]
+
+
+@register('random')
+def random_values(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """A different random value for every recipient."""
+    shape = _shape(recipient_phase, sender_phase)
+    if binary:
+        return rng.integers(0, 2, shape).astype(float)
+    return rng.random(shape)
+
+
+@register('split-brain')
+def split_brain(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """Recipients in the lower half of the ids get 0 and the others 1, every round."""
+    n = recipient_phase.shape[-1]
+    upper_half = (np.arange(n) >= n // 2).astype(float)
+    return np.broadcast_to(upper_half[:, np.newaxis], _shape(recipient_phase, sender_phase)).copy()
+
+
+@register('phase-targeted')
+def phase_targeted(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """High values to recipients in a higher phase than the sender and low values to
+    the others, byzantine_strategy_2 of DBACAlgorithm.py."""
+    higher = recipient_phase[..., :, np.newaxis] > sender_phase[..., np.newaxis, :]
+    if binary:
+        return higher.astype(float)
+    draws = rng.random(_shape(recipient_phase, sender_phase))
+    return np.where(higher, 0.75 + 0.25 * draws, 0.25 * draws)
+
+
+@register('extreme-value')
+def extreme_value(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """Every sender picks 0 or 1 for the round and sends it to everyone."""
+    extremes = rng.integers(0, 2, sender_phase.shape).astype(float)
+    return np.broadcast_to(extremes[..., np.newaxis, :], _shape(recipient_phase, sender_phase)).copy()
+
+
+@register('colluding')
+def colluding(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """All senders agree to send each recipient the extreme farthest from its value."""
+    target = (recipient_value < 0.5).astype(float)
+    return np.broadcast_to(target[..., :, np.newaxis], _shape(recipient_phase, sender_phase)).copy()
+
+
+@register('omission', omits=True)
+def omission(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """Byzantine senders send nothing.
+
+    DBAC nodes then only reach the (n + 3f) // 2 + 1 quorum from the n - f
+    correct nodes, which needs about n >= 5f. The DBAC engines reject the
+    configurations where n - f is below the quorum.
+    """
+    return np.full(_shape(recipient_phase, sender_phase), np.nan)
+
+
+@register('dbac-mix')
+def dbac_mix(rng, recipient_phase, recipient_value, sender_phase, binary=False):
+    """Every sender picks 'random' or 'phase-targeted' for the round with equal
+    probability, the Byzantine behaviour of DBACAlgorithm.py."""
+    targeted = rng.random(sender_phase.shape)[..., np.newaxis, :] < 0.5
+    return np.where(targeted,
+                    phase_targeted(rng, recipient_phase,
+                                   recipient_value, sender_phase, binary),
+                    random_values(rng, recipient_phase, recipient_value, sender_phase, binary))
@@ -0,0 +1,250 @@
+"""Real-time pacing of the consensus update on a fixed beacon period.
+
+Every vehicle (or DAC node) is an asyncio coroutine woken on its own periodic
+schedule, with a random offset within the period like unsynchronised V2X
+beacons. On every wake-up it takes the messages waiting in its asyncio.Queue,
+runs its update step, and broadcasts its new state into the queues of the
+other vehicles, losing each copy with the message loss rate.
+
+The wall-clock time of every update step goes into a latency histogram. A
+wake-up misses its deadline when the update and the broadcast have not
+finished within the budget, the beacon period by default, after the scheduled
+wake-up time. Late wake-ups count against the budget and their lateness has
+its own histogram.
+"""
+import asyncio
+import json
+import random
+import time
+
+import message_loss
+import seeding
+import tracing
+from Consensus_with_DAC_algorithm import DACAlgorithm
+from vehicles import Vehicle
+
+
+class LatencyHistogram:
+    """Durations counted in power-of-two microsecond buckets, bucket k holds [2^(k-1), 2^k) us."""
+
+    def __init__(self, buckets=24):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        bucket = int(seconds * 1e6).bit_length()
+        self.counts[min(bucket, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, q):
+        """Upper edge in seconds of the bucket holding the q-th percentile, 0 when empty."""
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return 2 ** bucket / 1e6
+        return 0.0
+
+    def as_dict(self):
+        """Summary and non-empty buckets keyed by their upper edge in microseconds, for JSON."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.maximum,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets_us': {2 ** bucket: count for bucket, count in enumerate(self.counts) if count}
+        }
+
+
+class PacingReport:
+    """Deadline misses and histograms of one paced run."""
+
+    def __init__(self, period, budget):
+        self.period = period
+        self.budget = budget
+        self.wakeups = 0
+        self.deadline_misses = 0
+        self.update_latency = LatencyHistogram()
+        self.wakeup_lateness = LatencyHistogram()
+        self.rounds = 0
+
+    def as_dict(self):
+        return {
+            'period': self.period,
+            'budget': self.budget,
+            'rounds': self.rounds,
+            'wakeups': self.wakeups,
+            'deadline_misses': self.deadline_misses,
+            'update_latency': self.update_latency.as_dict(),
+            'wakeup_lateness': self.wakeup_lateness.as_dict()
+        }
+
+
+class BeaconPacer:
+    """Runs one coroutine per node on the beacon schedule and collects the PacingReport.
+
+    step(node_id, messages) runs the update of a node on the messages it took
+    from its queue and returns the message it broadcasts next: the message, a
+    function of the recipient id for per-recipient messages (Byzantine senders)
+    or None to send nothing. done() ends the run, checked after every period.
+    """
+
+    def __init__(self, node_ids, recipients, step, done, message_loss_rate, period=0.1, budget=None,
+                 max_rounds=100, rng=random):
+        self.node_ids = node_ids
+        self.recipients = recipients  # Node id -> ids its broadcasts reach
+        self.step = step
+        self.done = done
+        self.message_loss_rate = message_loss_rate
+        self.period = period
+        self.max_rounds = max_rounds
+        self.rng = rng
+        self.report = PacingReport(
+            period, period if budget is None else budget)
+
+    async def run(self):
+        """Pace all nodes until done() or max_rounds periods and return the PacingReport."""
+        loop = asyncio.get_running_loop()
+        self.queues = {node_id: asyncio.Queue() for node_id in self.node_ids}
+        start = loop.time() + self.period
+        tasks = [asyncio.create_task(self.pace(node_id, start + self.rng.uniform(0, self.period)))
+                 for node_id in self.node_ids]
+
+        for current_round in range(1, self.max_rounds + 1):
+            await asyncio.sleep(max(0.0, start + current_round * self.period - loop.time()))
+            self.report.rounds = current_round
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.ROUND, current_round)
+            if self.done():
+                break
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return self.report
+
+    async def pace(self, node_id, first_wakeup):
+        """Wake node_id every period from first_wakeup, update it and broadcast its state."""
+        loop = asyncio.get_running_loop()
+        queue = self.queues[node_id]
+        report = self.report
+        wakeup = first_wakeup
+        while True:
+            await asyncio.sleep(max(0.0, wakeup - loop.time()))
+            report.wakeups += 1
+            report.wakeup_lateness.record(max(0.0, loop.time() - wakeup))
+
+            messages = []
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            started = time.perf_counter()
+            message = self.step(node_id, messages)
+            report.update_latency.record(time.perf_counter() - started)
+
+            if message is not None:
+                recipients = self.recipients[node_id]
+                lost = message_loss.sample_losses(
+                    self.rng, len(recipients), self.message_loss_rate)
+                for recipient, is_lost in zip(recipients, lost):
+                    if not is_lost:
+                        self.queues[recipient].put_nowait(
+                            message(recipient) if callable(message) else message)
+
+            if loop.time() > wakeup + report.budget:
+                report.deadline_misses += 1
+            wakeup += self.period
+
+
+def pace_vehicles(vehicles, f, message_loss_rate, rounds, period=0.1, budget=None, rng=random):
+    """Run Vehicle.update_state of every vehicle paced on the beacon period for rounds periods.
+
+    A Byzantine vehicle sends a random 0 or 1 to each recipient, as in Vehicle.broadcast_state.
+    """
+    total_vehicles = len(vehicles)
+    by_id = {vehicle.vehicle_id: vehicle for vehicle in vehicles}
+
+    def step(vehicle_id, messages):
+        vehicle = by_id[vehicle_id]
+        for sender_id, state in messages:
+            vehicle.receive_state(sender_id, state)
+        vehicle.update_state(total_vehicles, f)
+        if vehicle.is_byzantine:
+            return lambda recipient: (vehicle_id, rng.choice([0, 1]))
+        return vehicle_id, vehicle.current_state
+
+    pacer = BeaconPacer(
+        list(by_id), {vehicle_id: [other for other in by_id if other != vehicle_id] for vehicle_id in by_id},
+        step, lambda: False, message_loss_rate, period=period, budget=budget, max_rounds=rounds, rng=rng)
+    return asyncio.run(pacer.run())
+
+
+def pace_dac(dac, period=0.1, budget=None, max_rounds=100):
+    """Run DACAlgorithm.process_messages of every correct node paced on the beacon period until all reach pend."""
+    correct = [node for node in dac.nodes if not node.faulty]
+
+    def step(node_id, messages):
+        node = dac.nodes[node_id]
+        dac.process_messages(node, messages)
+        return node.id, node.value, node.phase
+
+    pacer = BeaconPacer(
+        [node.id for node in correct],
+        {node.id: [other.id for other in dac.recipients(node) if not other.faulty] for node in correct},
+        step, lambda: all(node.phase == dac.pend for node in correct), dac.message_loss_rate,
+        period=period, budget=budget, max_rounds=max_rounds, rng=dac.rng)
+    return asyncio.run(pacer.run())
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+
+    # Beacon period and update budget in seconds
+    configurations = [
+        {'engine': 'simulation', 'N': 200, 'f': 20, 'message_loss_rate': 0.1,
+            'epsilon': 0.01, 'rounds': 20, 'period': 0.1},
+        {'engine': 'DAC', 'N': 200, 'f': 60, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01, 'period': 0.1},
+    ]
+
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []
+
+    for config in configurations:
+        for _ in range(num_runs):
+            seed = next(seeds)
+            rng = seeding.make_rng(seed)
+            print(f"\nPacing {config['engine']} with configuration: {config}")
+            if config['engine'] == 'simulation':
+                byzantine_vehicles = set(rng.sample(range(config['N']), config['f']))
+                vehicles = [Vehicle(i, rng.randint(0, 1), config['epsilon'],
+                                    is_byzantine=(i in byzantine_vehicles), rng=rng)
+                            for i in range(config['N'])]
+                report = pace_vehicles(vehicles, config['f'], config['message_loss_rate'],
+                                       config['rounds'], period=config['period'], rng=rng)
+            else:
+                try:
+                    dac = DACAlgorithm(config['N'], config['f'], config['message_loss_rate'],
+                                       config['initial_ratio'], config['epsilon'], rng=rng)
+                except ValueError as error:
+                    # Quorums out of reach, the same for every run of the configuration
+                    print(f"Skipping configuration {config}: {error}")
+                    break
+                report = pace_dac(dac, period=config['period'])
+            print(f"{report.deadline_misses} deadline misses in {report.wakeups} wake-ups, "
+                  f"p99 update latency {report.update_latency.percentile(99) * 1e3:.3f} ms")
+            results.append({'config': config, 'seed': seed, **report.as_dict()})
+
+    # Write results to JSON file
+    with open('beacon_pacing_results.json', 'w') as f:
+        json.dump(results, f, indent=4)
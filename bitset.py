@@ -0,0 +1,38 @@
+class BitVector:
+    """Received-message bit vector backed by a Python int, N bits per node instead of N list slots."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def single(cls, index):
+        """Bit vector with only `index` set, e.g. a node marking itself as received."""
+        return cls(1 << index)
+
+    def set(self, index):
+        self.bits |= 1 << index
+
+    def test(self, index):
+        return self.bits >> index & 1
+
+    def reset(self, index=None):
+        """Clear every bit, keeping `index` set when given."""
+        self.bits = 0 if index is None else 1 << index
+
+    def count(self):
+        """Number of set bits."""
+        return self.bits.bit_count()
+
+    def indices(self):
+        """Yield the set bits in increasing order."""
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def __getitem__(self, index):
+        # Read access like the former list, R[i] is 0 or 1
+        return self.bits >> index & 1
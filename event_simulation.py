@@ -0,0 +1,379 @@
+"""Discrete-event simulator measuring the time to consensus instead of rounds.
+
+The lock-step engines only count rounds. EventSimulator replaces the rounds by
+beacons and delivery delays: every node broadcasts its state every
+beacon_interval seconds (each node with its own random offset), every copy of a
+broadcast is lost with the loss rate of the algorithm or delivered after a
+sampled latency, and a node applies each message as it arrives.
+
+Events sit in a heapq priority queue ordered by time. A broadcast is a single
+queue entry for its deliveries, sorted by arrival time, so the queue holds one
+entry per broadcast in flight rather than one per message.
+
+The engine drives the nodes of an existing DACAlgorithm, EarlyDACAlgorithm or
+DBACAlgorithm through the reactions classes below, so it shares their setup,
+faulty nodes, loss rate and termination phase.
+"""
+import heapq
+import itertools
+import json
+from time import perf_counter
+
+import numpy as np
+
+import adversary
+import DBACAlgorithm as dbac
+import seeding
+import tracing
+from Consensus_with_DAC_algorithm import DACAlgorithm
+from DBACAlgorithm import AdversaryPayload, DBACAlgorithm
+from Early_DAC_ALGO import EarlyDACAlgorithm
+
+# Event kinds, a beacon timer of a node or the deliveries of one broadcast
+BEACON = 0
+DELIVERY = 1
+
+
+def exponential_latency(minimum=0.001, mean=0.004):
+    """Latency sampler: a fixed minimum delay plus an exponential queueing delay, in seconds."""
+    def sample(generator, count):
+        return minimum + generator.exponential(mean, count)
+    return sample
+
+
+def uniform_latency(low=0.001, high=0.01):
+    """Latency sampler drawing delays uniformly between low and high seconds."""
+    def sample(generator, count):
+        return generator.uniform(low, high, count)
+    return sample
+
+
+class DACReactions:
+    """DACAlgorithm (Consensus_with_DAC_algorithm.py) one message at a time.
+
+    The quorum is checked after every message instead of at the end of a round.
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.nodes = algorithm.nodes
+        self.pend = algorithm.pend
+        # Recipients are fixed, so are the quorums
+        self.quorums = [algorithm.quorum(node) for node in self.nodes]
+
+    def correct(self):
+        """Ids of the nodes that broadcast and decide, crashed nodes do neither."""
+        return [node.id for node in self.nodes if not node.faulty]
+
+    def broadcasting(self):
+        """Ids of the nodes that broadcast."""
+        return self.correct()
+
+    def recipients(self, node_id):
+        return [other.id for other in self.algorithm.recipients(self.nodes[node_id]) if not other.faulty]
+
+    def message(self, node_id):
+        node = self.nodes[node_id]
+        return node_id, node.value, node.phase
+
+    def receive(self, node_id, message):
+        """Apply one message to the node, True when it makes the node reach pend."""
+        node = self.nodes[node_id]
+        if node.phase == self.pend:
+            return False
+        sender_id, sender_value, sender_phase = message
+        if sender_phase > node.phase:
+            node.value = sender_value
+            node.phase = sender_phase
+            node.reset_for_next_phase()
+        elif sender_phase == node.phase:
+            # Bit operations on R inline, this runs for every delivered message
+            received = node.R
+            bit = 1 << sender_id
+            if received.bits & bit:
+                return False
+            received.bits |= bit
+            if sender_value < node.min_value:
+                node.min_value = sender_value
+            elif sender_value > node.max_value:
+                node.max_value = sender_value
+            if received.bits.bit_count() >= self.quorums[node_id]:
+                node.update_value()
+                node.phase += 1
+                node.reset_for_next_phase()
+                if tracing.level <= tracing.INFO:
+                    tracing.emit(tracing.PHASE_ADVANCE,
+                                 node.id, node.phase, node.value)
+        else:
+            return False
+        return node.phase == self.pend
+
+
+class EarlyDACReactions(DACReactions):
+    """EarlyDACAlgorithm (Early_DAC_ALGO.py) one message at a time.
+
+    The phase rules are those of EarlyDACAlgorithm.run and early_dac_round of
+    numba_backend.py, where every received message counts as an identical value
+    and the first one is adopted. Without rounds, the messages counted are all
+    the ones the node received since it entered its phase, its own value not
+    included.
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.nodes = algorithm.nodes
+        self.pend = algorithm.pend
+        # Values of the messages received by each node in its current phase, in arrival order
+        self.values = {node.id: [] for node in self.nodes}
+
+    def recipients(self, node_id):
+        # EarlyDACAlgorithm broadcasts to every other node
+        return [other.id for other in self.nodes if other.id != node_id and not other.faulty]
+
+    def receive(self, node_id, message):
+        """Apply one message to the node, True when it makes the node reach pend."""
+        node = self.nodes[node_id]
+        if node.phase == self.pend:
+            return False
+        sender_id, sender_value, sender_phase = message
+        if sender_phase > node.phase:
+            node.value = sender_value
+            node.phase = sender_phase
+            node.reset_for_next_phase()
+            self.values[node_id] = [sender_value]
+            return node.phase == self.pend
+        values = self.values[node_id]
+        values.append(sender_value)
+        if sender_phase < node.phase or node.R.test(sender_id):
+            return False
+        node.R.set(sender_id)
+        if node.R.count() >= 2 * node.f + 1:
+            # All received values count as identical values, as in EarlyDACAlgorithm.run
+            if len(values) >= 2 * node.f + 1:
+                node.value = values[0]
+                node.phase = self.pend  # Early-stopping
+                if tracing.level <= tracing.INFO:
+                    tracing.emit(tracing.EARLY_STOP, node.id, node.value)
+            elif len(values) >= node.f + 1:
+                node.value = values[0]
+                node.phase += 1
+            else:
+                node.value = (min(values) + max(values)) / 2
+                node.phase += 1
+            if tracing.level <= tracing.INFO:
+                tracing.emit(tracing.PHASE_ADVANCE,
+                             node.id, node.phase, node.value)
+            node.reset_for_next_phase()
+            self.values[node_id] = []
+        return node.phase == self.pend
+
+
+class DBACReactions:
+    """DBACAlgorithm (DBACAlgorithm.py) one message at a time.
+
+    Byzantine nodes broadcast like in DBACAlgorithm, with their own strategies
+    or the adversary strategy of the algorithm, and only correct nodes decide.
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.nodes = algorithm.nodes
+
+    def correct(self):
+        """Ids of the nodes that decide."""
+        return [node.node_id for node in self.nodes if not node.is_byzantine]
+
+    def broadcasting(self):
+        """Ids of the nodes that broadcast, Byzantine nodes included."""
+        return [node.node_id for node in self.nodes]
+
+    def recipients(self, node_id):
+        return [other.node_id for other in self.algorithm.neighbours(self.nodes[node_id])
+                if other.node_id != node_id]
+
+    def message(self, node_id):
+        node = self.nodes[node_id]
+        if node.is_byzantine and self.algorithm.adversary is not None:
+            phases = [other.phase for other in self.nodes]
+            values = adversary.payload(self.algorithm.adversary, self.algorithm.adversary_rng, phases,
+                                       [other.vi for other in self.nodes], [node.phase])
+            return node_id, AdversaryPayload(values[:, 0]), node.phase
+        return node.broadcast(None)
+
+    def receive(self, node_id, message):
+        """Apply one message to the node, True when it makes the node reach p_end."""
+        node = self.nodes[node_id]
+        if node.phase == dbac.p_end:
+            return False
+        # Losses are drawn by the simulator
+        node.accept_message(*message)
+        if node.count_received_messages() < self.algorithm.quorum(node):
+            return False
+        node.vi = (node.trimmed_low() + node.trimmed_high()) / 2
+        node.phase += 1
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.PHASE_ADVANCE, node.node_id, node.phase, node.vi)
+        node.reset_after_phase_increment()
+        return node.phase == dbac.p_end and not node.is_byzantine
+
+
+# Algorithm class -> its reactions
+REACTIONS = {
+    DACAlgorithm: DACReactions,
+    EarlyDACAlgorithm: EarlyDACReactions,
+    DBACAlgorithm: DBACReactions,
+}
+
+
+class EventSimulator:
+    """Asynchronous run of a consensus algorithm driven by a heap-ordered event queue.
+
+    Recipients are fixed at the start, with a topology the neighbourhoods of the
+    initial positions. After run(), decision_times maps every correct node to the
+    time it reached its final phase, None for the ones that did not by max_time.
+    """
+
+    def __init__(self, algorithm, beacon_interval=0.1, latency=None, max_time=60.0, rng=None):
+        reactions = next((reactions for cls, reactions in REACTIONS.items()
+                          if isinstance(algorithm, cls)), None)
+        if reactions is None:
+            raise ValueError(
+                f"No event-driven reactions for {type(algorithm).__name__}, "
+                f"expected one of {[cls.__name__ for cls in REACTIONS]}")
+        self.algorithm = algorithm
+        self.reactions = reactions(algorithm)
+        self.beacon_interval = beacon_interval
+        self.latency = exponential_latency() if latency is None else latency
+        self.max_time = max_time
+        # NumPy generator of the run, derived from the generator of the algorithm unless given
+        self.rng = np.random.default_rng(
+            algorithm.rng.getrandbits(63)) if rng is None else rng
+        self.decision_times = {}
+        self.events = 0
+
+    def run(self):
+        """Run until every correct node decided and return the time of the last decision, None past max_time."""
+        reactions = self.reactions
+        receive = reactions.receive
+        message = reactions.message
+        generator = self.rng
+        latency = self.latency
+        loss_rate = self.algorithm.message_loss_rate
+        interval = self.beacon_interval
+        max_time = self.max_time
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        heapreplace = heapq.heapreplace
+
+        broadcasting = reactions.broadcasting()
+        recipients = {node_id: np.array(reactions.recipients(node_id), dtype=np.int64)
+                      for node_id in broadcasting}
+        self.decision_times = dict.fromkeys(reactions.correct())
+        decision_times = self.decision_times
+        undecided = len(decision_times)
+
+        counter = itertools.count()
+        queue = [(offset, next(counter), BEACON, node_id) for node_id, offset in zip(
+            broadcasting, (generator.random(len(broadcasting)) * interval).tolist())]
+        heapq.heapify(queue)
+        events = 0
+        time = 0.0
+
+        while queue and undecided:
+            time, _, kind, data = queue[0]
+            if time > max_time:
+                break
+            events += 1
+
+            if kind == DELIVERY:
+                # data is [position, arrival times, recipient ids, message]
+                position, times, ids, payload = data
+                node_id = ids[position]
+                if receive(node_id, payload):
+                    decision_times[node_id] = time
+                    undecided -= 1
+                position += 1
+                if position < len(times):
+                    data[0] = position
+                    heapreplace(
+                        queue, (times[position], next(counter), DELIVERY, data))
+                else:
+                    heappop(queue)
+                continue
+
+            heapreplace(
+                queue, (time + interval, next(counter), BEACON, data))
+            others = recipients[data]
+            delivered = others[generator.random(len(others)) >= loss_rate]
+            if len(delivered) == 0:
+                continue
+            arrivals = time + latency(generator, len(delivered))
+            order = arrivals.argsort()
+            times = arrivals[order].tolist()
+            heappush(queue, (times[0], next(counter), DELIVERY,
+                                   [0, times, delivered[order].tolist(), message(data)]))
+
+        self.events = events
+        return None if undecided else time
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+
+    configurations = [
+        {'algorithm': 'DAC', 'N': 1000, 'f': 300, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+        {'algorithm': 'EarlyDAC', 'N': 1000, 'f': 300, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+        {'algorithm': 'DBAC', 'N': 1000, 'f': 199, 'message_loss_rate': 0.1,
+            'epsilon': 0.01},
+    ]
+
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []
+
+    for config in configurations:
+        for _ in range(num_runs):
+            seed = next(seeds)
+            print(f"\nRunning event-driven {config['algorithm']} with configuration: {config}")
+            rng = seeding.make_rng(seed)
+            try:
+                if config['algorithm'] == 'DBAC':
+                    algorithm = DBACAlgorithm(
+                        config['N'], config['f'], config['message_loss_rate'], config['epsilon'], rng=rng)
+                else:
+                    algorithm_class = DACAlgorithm if config['algorithm'] == 'DAC' else EarlyDACAlgorithm
+                    algorithm = algorithm_class(
+                        config['N'], config['f'], config['message_loss_rate'], config['initial_ratio'],
+                        config['epsilon'], rng=rng)
+            except ValueError as error:
+                # Quorums out of reach, the same for every run of the configuration
+                print(f"Skipping configuration {config}: {error}")
+                break
+            simulator = EventSimulator(algorithm)
+            started = perf_counter()
+            consensus_time = simulator.run()
+            events_per_second = simulator.events / (perf_counter() - started)
+            print(f"Consensus after {consensus_time} s, {simulator.events} events, "
+                  f"{events_per_second:.0f} events/s")
+
+            result = {
+                'config': config,
+                'consensus_time': consensus_time,
+                'decision_times': sorted(t for t in simulator.decision_times.values() if t is not None),
+                'events': simulator.events,
+                'events_per_second': events_per_second,
+                'num_nodes': config['N'],
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
+            }
+            results.append(result)
+
+    # Write results to JSON file
+    with open('event_simulation_results.json', 'w') as f:
+        json.dump(results, f, indent=4)
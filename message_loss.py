@@ -0,0 +1,36 @@
+"""Message-loss sampling that only draws the rarer outcome.
+
+Every message of a broadcast is lost independently with probability
+loss_rate, the same Bernoulli draw as `rng.random() <= loss_rate` per message.
+Instead of one draw per message, geometric skip lengths jump from one rare
+outcome to the next (losses below 50% loss, deliveries above), so a broadcast
+to count recipients costs about min(p, 1 - p) * count + 1 draws.
+"""
+import math
+
+
+def _rare_indices(rng, count, probability):
+    """Yield the positions in range(count) hit with the given probability, in order."""
+    if probability <= 0.0:
+        return
+    log_miss = math.log1p(-probability)
+    index = -1
+    while True:
+        # Misses before the next hit are geometric, sampled by inversion (1 - random() is in (0, 1])
+        index += 1 + int(math.log(1.0 - rng.random()) / log_miss)
+        if index >= count:
+            return
+        yield index
+
+
+def sample_losses(rng, count, loss_rate):
+    """Return a list of count flags, True where the message is lost."""
+    if loss_rate <= 0.5:
+        lost = [False] * count
+        for index in _rare_indices(rng, count, loss_rate):
+            lost[index] = True
+    else:
+        lost = [True] * count
+        for index in _rare_indices(rng, count, 1.0 - loss_rate):
+            lost[index] = False
+    return lost
@@ -0,0 +1,70 @@
+"""Vehicle mobility between consensus rounds.
+
+A mobility model owns the vehicle positions, step() advances them by one round
+(round_duration seconds) and returns them, ready for topology.GridTopology.move().
+Speeds are in m/s and positions in metres.
+"""
+import math
+import random
+
+
+class HighwayMobility:
+    """Constant-velocity traffic on a straight highway that wraps around at its end.
+
+    Lanes are lane_width apart, even lanes drive towards +x and odd lanes towards -x.
+    """
+
+    def __init__(self, total_vehicles, length, lanes=4, lane_width=3.5, min_speed=22.0, max_speed=36.0,
+                 round_duration=0.1, rng=random):
+        self.length = length
+        self.round_duration = round_duration
+        self.positions = []
+        self.velocities = []
+        for _ in range(total_vehicles):
+            lane = rng.randrange(lanes)
+            direction = 1 if lane % 2 == 0 else -1
+            self.positions.append((rng.uniform(0, length), lane * lane_width))
+            self.velocities.append(direction * rng.uniform(min_speed, max_speed))
+
+    def step(self):
+        """Advance every vehicle by one round and return the new positions."""
+        self.positions = [((x + velocity * self.round_duration) % self.length, y)
+                          for (x, y), velocity in zip(self.positions, self.velocities)]
+        return self.positions
+
+
+class RandomWaypointMobility:
+    """Random waypoint model: every vehicle drives straight to a random point of
+    the area at a random speed, then picks the next point and speed."""
+
+    def __init__(self, total_vehicles, width, height, min_speed=5.0, max_speed=15.0,
+                 round_duration=0.1, rng=random):
+        self.width = width
+        self.height = height
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.round_duration = round_duration
+        self.rng = rng
+        self.positions = [self.random_point() for _ in range(total_vehicles)]
+        self.waypoints = [self.random_point() for _ in range(total_vehicles)]
+        self.speeds = [rng.uniform(min_speed, max_speed)
+                       for _ in range(total_vehicles)]
+
+    def random_point(self):
+        return self.rng.uniform(0, self.width), self.rng.uniform(0, self.height)
+
+    def step(self):
+        """Advance every vehicle by one round and return the new positions."""
+        for i, (x, y) in enumerate(self.positions):
+            waypoint_x, waypoint_y = self.waypoints[i]
+            distance = math.hypot(waypoint_x - x, waypoint_y - y)
+            travel = self.speeds[i] * self.round_duration
+            if distance <= travel:
+                # Waypoint reached, head for the next one
+                self.positions[i] = self.waypoints[i]
+                self.waypoints[i] = self.random_point()
+                self.speeds[i] = self.rng.uniform(self.min_speed, self.max_speed)
+            else:
+                self.positions[i] = (x + (waypoint_x - x) * travel / distance,
+                                     y + (waypoint_y - y) * travel / distance)
+        return self.positions
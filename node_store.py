@@ -0,0 +1,72 @@
+"""Struct-of-arrays storage for the scalar per-node fields of the Node classes.
+
+A NodeStore keeps one array.array per field, indexed by node id, instead of a
+boxed number per field in every node object. store_backed() rebuilds a Node
+class with the stored fields taken out of its __slots__ and replaced by
+StoredField descriptors into a store, so the Node API is unchanged
+(node.value = 0.5 writes store.value[node.id]) while the values of all nodes
+sit next to each other. The arrays support the buffer protocol,
+numpy.frombuffer(store.value) views a field without copying.
+
+Typecodes are those of the array module: 'd' for floats, 'q' for integers and
+'b' for booleans, which read back as bool.
+
+Only scalar fields are stored, a few dozen bytes per node. The per-node
+collections stay Python objects: the received bit vectors R of the DAC
+family, Ri, the heaps and the inbox of DBAC, the received states of a
+Vehicle. In an all-to-all DAC run R alone grows to N bits per node, about
+1.25 GB at N=100k, whatever the layout of the nodes.
+"""
+from array import array
+from operator import attrgetter
+
+
+class NodeStore:
+    """One zero-initialised array per field of `fields` (name -> typecode) for size nodes."""
+
+    def __init__(self, size, fields):
+        self.size = size
+        self.fields = dict(fields)
+        for name, typecode in self.fields.items():
+            setattr(self, name, array(typecode, bytes(
+                size * array(typecode).itemsize)))
+
+
+class StoredField:
+    """Node attribute kept at the node's id in the array of the same name of the class store."""
+
+    def __init__(self, node_id, convert=None):
+        self.node_id = node_id  # Reads the id of a node
+        self.convert = convert
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, node, owner=None):
+        if node is None:
+            return self
+        value = getattr(node.store, self.name)[self.node_id(node)]
+        return value if self.convert is None else self.convert(value)
+
+    def __set__(self, node, value):
+        getattr(node.store, self.name)[self.node_id(node)] = value
+
+
+def store_backed(node_class, size, id_field, fields):
+    """Copy of node_class keeping `fields` of its size nodes in a new NodeStore, the `store` attribute.
+
+    The copy has the methods of node_class and its __slots__ without `fields`,
+    a subclass would still carry the unused slots. id_field names the node id
+    attribute, which node_class.__init__ must set before the stored fields.
+    """
+    node_id = attrgetter(id_field)
+    slots = node_class.__slots__
+    namespace = {name: value for name, value in vars(node_class).items()
+                 if name not in slots and name not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = tuple(
+        name for name in slots if name not in fields)
+    namespace['store'] = NodeStore(size, fields)
+    for name, typecode in fields.items():
+        namespace[name] = StoredField(
+            node_id, bool if typecode == 'b' else None)
+    return type(node_class.__name__, node_class.__bases__, namespace)
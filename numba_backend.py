@@ -0,0 +1,241 @@
+"""Compiled round loops for Early-DAC (Early_DAC_ALGO.py) and DBAC (DBACAlgorithm.py).
+
+The per-message logic of both algorithms is order dependent (phase jumps part
+way through the inbox, counting of received values, early stopping), so instead
+of whole-array NumPy operations the round loops are compiled with Numba over
+flat arrays: node values and phases as vectors, the received vectors R / Ri and
+the delivery mask as N x N boolean matrices indexed [receiver, sender].
+
+Numba is optional. CompiledEarlyDACAlgorithm and CompiledDBACAlgorithm are used
+like the classes they extend and fall back to their Python run() when Numba is
+not installed, when tracing is enabled (the kernels emit no events) and, for
+DBAC, with a topology or an adversary.
+"""
+import numpy as np
+
+import DBACAlgorithm as dbac
+import tracing
+from Early_DAC_ALGO import EarlyDACAlgorithm
+
+try:
+    import numba
+except ImportError:  # Optional, the Python classes run without it
+    numba = None
+
+
+def _compile(function):
+    return function if numba is None else numba.njit(cache=True)(function)
+
+
+@_compile
+def early_dac_round(value, phase, faulty, R, delivered, pend, f):
+    """Process one round of delivered messages, the loop of EarlyDACAlgorithm.run."""
+    n = value.shape[0]
+    # Every message carries the state of its sender at broadcast time
+    sent_value = value.copy()
+    sent_phase = phase.copy()
+
+    for i in range(n):
+        if faulty[i]:
+            continue
+
+        # Received messages in sender order, their count, first value, min and max
+        received = 0
+        first_value = 0.0
+        min_value = np.inf
+        max_value = -np.inf
+        for j in range(n):
+            if delivered[i, j]:
+                if received == 0:
+                    first_value = sent_value[j]
+                received += 1
+                min_value = min(min_value, sent_value[j])
+                max_value = max(max_value, sent_value[j])
+
+        if phase[i] == pend:
+            continue  # Node will broadcast but not update its state or jump phases
+
+        count = 0
+        for j in range(n):
+            if R[i, j]:
+                count += 1
+
+        for j in range(n):
+            if not delivered[i, j]:
+                continue
+            if sent_phase[j] > phase[i]:
+                value[i] = sent_value[j]
+                phase[i] = sent_phase[j]
+                R[i, :] = False
+                R[i, i] = True
+                count = 1
+            elif sent_phase[j] == phase[i] and not R[i, j]:
+                R[i, j] = True
+                count += 1
+                if count >= 2 * f + 1:
+                    # All received values count as identical values, as in EarlyDACAlgorithm.run
+                    if received >= 2 * f + 1:
+                        value[i] = first_value
+                        phase[i] = pend  # Early-stopping
+                    elif received >= f + 1:
+                        value[i] = first_value
+                        phase[i] += 1
+                    else:
+                        value[i] = (min_value + max_value) / 2
+                        phase[i] += 1
+                    R[i, :] = False
+                    R[i, i] = True
+                    count = 1
+
+
+@_compile
+def early_dac_run(value, phase, faulty, pend, f, message_loss_rate, seed):
+    """Run Early-DAC to termination and return the number of rounds, like EarlyDACAlgorithm.run."""
+    np.random.seed(seed)
+    n = value.shape[0]
+    R = np.eye(n, dtype=np.bool_)
+    delivered = np.zeros((n, n), dtype=np.bool_)
+    rounds = 0
+
+    while True:
+        rounds += 1
+        all_terminated = True
+        for i in range(n):
+            if not faulty[i] and phase[i] != pend:
+                all_terminated = False
+        if all_terminated:
+            return rounds
+
+        # Crashed nodes do not broadcast, every other message is lost with the loss rate
+        for j in range(n):
+            for i in range(n):
+                delivered[i, j] = i != j and not faulty[j] and \
+                    np.random.random() > message_loss_rate
+        early_dac_round(value, phase, faulty, R, delivered, pend, f)
+
+
+@_compile
+def dbac_round(vi, phase, Ri, stored, delivered, payload, p_end, f, quorum):
+    """Accept one round of delivered messages and advance the nodes that reached the quorum."""
+    n = vi.shape[0]
+    for i in range(n):
+        if phase[i] < p_end:
+            for j in range(n):
+                if delivered[i, j] and not Ri[i, j] and phase[j] >= phase[i]:
+                    Ri[i, j] = True
+                    stored[i, j] = payload[i, j]
+
+    for i in range(n):
+        if phase[i] == p_end:
+            continue
+        count = 0
+        for j in range(n):
+            if Ri[i, j]:
+                count += 1
+        if count >= quorum:
+            # Midpoint of the (f + 1)-th smallest and (f + 1)-th largest received values
+            values = np.empty(count - 1)
+            k = 0
+            for j in range(n):
+                if Ri[i, j] and j != i:
+                    values[k] = stored[i, j]
+                    k += 1
+            values.sort()
+            trim = min(f, k - 1)
+            vi[i] = (values[trim] + values[k - 1 - trim]) / 2
+            phase[i] += 1
+            Ri[i, :] = False
+            Ri[i, i] = True
+
+
+@_compile
+def dbac_run(vi, phase, f, message_loss_rate, p_end, quorum, seed, max_rounds):
+    """Run DBAC until all nodes reach p_end and return the number of rounds, like DBACAlgorithm.run.
+
+    Returns 0 when the nodes did not reach p_end within max_rounds.
+    """
+    np.random.seed(seed)
+    n = vi.shape[0]
+    Ri = np.eye(n, dtype=np.bool_)
+    stored = np.zeros((n, n))
+    delivered = np.zeros((n, n), dtype=np.bool_)
+    payload = np.zeros((n, n))
+    for rounds in range(1, max_rounds + 1):
+        for j in range(n):
+            # The first f nodes are Byzantine and pick one strategy for the round
+            strategy_2 = j < f and np.random.random() < 0.5
+            for i in range(n):
+                delivered[i, j] = i != j and np.random.random() >= message_loss_rate
+                if not delivered[i, j]:
+                    continue
+                if j >= f:
+                    payload[i, j] = vi[j]
+                elif strategy_2:
+                    # High values for nodes with higher phases, low values for the others
+                    if phase[i] > phase[j]:
+                        payload[i, j] = 0.75 + 0.25 * np.random.random()
+                    else:
+                        payload[i, j] = 0.25 * np.random.random()
+                else:
+                    payload[i, j] = np.random.random()
+        dbac_round(vi, phase, Ri, stored, delivered,
+                   payload, p_end, f, quorum)
+
+        terminated = True
+        for i in range(n):
+            if phase[i] != p_end:
+                terminated = False
+        if terminated:
+            return rounds
+    return 0
+
+
+class CompiledEarlyDACAlgorithm(EarlyDACAlgorithm):
+    """EarlyDACAlgorithm whose run() uses the compiled kernel when Numba is installed."""
+
+    def run(self):
+        """Run the Early-DAC algorithm and count the number of rounds to termination."""
+        if numba is None or tracing.level < tracing.OFF:
+            return super().run()
+
+        value = np.array([node.value for node in self.nodes], dtype=float)
+        phase = np.array([node.phase for node in self.nodes], dtype=np.int64)
+        faulty = np.array([node.faulty for node in self.nodes])
+        f = self.nodes[0].f if self.nodes else 0
+        rounds = early_dac_run(value, phase, faulty, self.pend, f,
+                               self.message_loss_rate, self.rng.getrandbits(32))
+
+        for node in self.nodes:
+            node.value = float(value[node.id])
+            node.phase = int(phase[node.id])
+            node.reset_for_next_phase()
+        print(f"All nodes reached termination after {rounds} rounds.")
+        return rounds
+
+
+class CompiledDBACAlgorithm(dbac.DBACAlgorithm):
+    """DBACAlgorithm whose run() uses the compiled kernel when Numba is installed."""
+
+    def run(self, max_rounds=dbac.MAX_ROUNDS):
+        """Runs the DBAC algorithm until all nodes reach p_end, None if they did not within max_rounds."""
+        if numba is None or tracing.level < tracing.OFF or \
+                self.topology is not None or self.adversary is not None:
+            return super().run(max_rounds)
+
+        # n, f and p_end are module globals of DBACAlgorithm.py set by the constructor
+        vi = np.array([node.vi for node in self.nodes])
+        phase = np.array([node.phase for node in self.nodes], dtype=np.int64)
+        rounds = dbac_run(
+            vi, phase, dbac.f, self.message_loss_rate, dbac.p_end,
+            (dbac.n + 3 * dbac.f) // 2 + 1, self.rng.getrandbits(32), max_rounds - self.round_counter)
+
+        for node in self.nodes:
+            node.vi = float(vi[node.node_id])
+            node.phase = int(phase[node.node_id])
+            node.reset_after_phase_increment()
+        if not rounds:
+            self.round_counter = max_rounds
+            print(f"Nodes did not reach p_end within {max_rounds} rounds.")
+            return None
+        self.round_counter += rounds
+        return self.round_counter
@@ -0,0 +1,288 @@
+"""Plotting entry point, one subcommand per figure type.
+
+    python plots.py nodes DAC_Algorithm_Results.json:DAC Early-DAC_AlgoResults.json:Early-DAC
+    python plots.py loss-rate AC_Algorithm_Results.json --output AC_loss_rate.png
+    python plots.py all --input-dir . --output-dir plots
+
+The rounds figures (nodes, loss-rate, ratio) draw a box plot of the rounds to
+convergence of one or more results files, given as PATH or PATH:LABEL, with the
+algorithms side by side. all regenerates every figure of FIGURES whose results
+files exist. The per-figure scripts (Plot_Rounds_VS_Nodes.py, boxplot.py, ...)
+call plot() with their entry of FIGURES and show the figure.
+
+Figures are saved with the Agg backend, which needs no display; --show opens
+a window instead. matplotlib and seaborn are imported only when a figure is
+drawn, so --help and argument errors return at once.
+"""
+import argparse
+import json
+import os
+import statistics
+
+# Colours of the compared algorithms, in the order of the results files
+COLOURS = ['#4C72B0', '#55A868', '#C44E52']
+
+# x axis of the rounds figures: label and value of a results entry
+ROUND_AXES = {
+    'nodes': ('Number of Nodes', lambda entry: entry['num_nodes']),
+    'loss-rate': ('Message Loss Rate (%)', lambda entry: entry['message_loss_rate'] * 100),
+    # Older results files store the ratio as 'initial ratio'
+    'ratio': ('Initial Ratio (%)', lambda entry: (entry['initial ratio'] if 'initial ratio' in entry
+                                                  else entry['config']['initial_ratio']) * 100),
+}
+
+DAC_FAMILY = [('DAC_Algorithm_Results.json', 'DAC'), ('Early-DAC_AlgoResults.json', 'Early-DAC'),
+              ('Tunable_Early-DAC(5)_AlgoResults.json', 'Tunable Early-DAC(5)')]
+
+# Figures regenerated by the all subcommand: figure type, results files, output file
+FIGURES = [
+    ('nodes', DAC_FAMILY, 'Rounds_vs_Nodes.png'),
+    ('ratio', DAC_FAMILY, 'Rounds_vs_Ratio.png'),
+    ('loss-rate', DAC_FAMILY, 'Rounds_vs_MessageLossRate.png'),
+    ('nodes', [('AC_Algorithm_Results.json', 'AC')], 'AC_Rounds_vs_Nodes.png'),
+    ('loss-rate', [('AC_Algorithm_Results.json', 'AC')], 'AC_Rounds_vs_MessageLossRate.png'),
+    ('nodes', [('DAC_Algorithm_Results.json', 'DAC')], 'DAC_Rounds_vs_Nodes.png'),
+    ('loss-rate', [('DAC_Algorithm_Results.json', 'DAC')], 'DAC_Rounds_vs_MessageLossRate.png'),
+    ('nodes', [('dbac_results.json', 'DBAC')], 'DBAC_Rounds_vs_Nodes.png'),
+    ('loss-rate', [('dbac_results.json', 'DBAC')], 'DBAC_Rounds_vs_MessageLossRate.png'),
+    ('average-rounds', [('simulation_results.json', None)], 'Average_Rounds_vs_Vehicles.png'),
+    ('average-rounds', [('Alternative_resultes.json', None)], 'Alternative_Average_Rounds_vs_Vehicles.png'),
+    ('consensus-boxplot', [('simulation_results.json', None)], 'rounds_to_reach_consensus_boxplot.png'),
+    ('message-loss', [('simulation_results.json', None)], 'message_loss_per_round_linegraph.png'),
+]
+
+
+def pyplot(show=False):
+    """matplotlib.pyplot, switched to the Agg backend unless the figures are shown."""
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def results_file(spec):
+    """(path, label) of a PATH or PATH:LABEL argument, the label defaulting to the file name."""
+    path, separator, label = spec.rpartition(':')
+    if not separator:
+        path = spec
+        label = os.path.splitext(os.path.basename(spec))[0]
+    return path, label
+
+
+def draw_rounds(plt, axis, results, mean_line=False):
+    """Box plot of the rounds to convergence against axis for the (path, label) results files."""
+    import seaborn as sns
+
+    x_label, x_value = ROUND_AXES[axis]
+    data = {x_label: [], 'Rounds to Convergence': [], 'Algorithm': []}
+    for path, label in results:
+        unfinished = 0
+        for entry in load_results(path):
+            if entry['rounds'] is None:
+                # Runs stopped at the round cap and skipped configurations have no rounds
+                unfinished += 1
+                continue
+            data[x_label].append(x_value(entry))
+            data['Rounds to Convergence'].append(entry['rounds'])
+            data['Algorithm'].append(label)
+        if unfinished:
+            print(f"{label}: left out {unfinished} runs that did not terminate")
+
+    colours = COLOURS[:len(results)] if len(results) <= len(COLOURS) else None
+    # Style of this figure only, all draws the other figures in the same process
+    with sns.axes_style("whitegrid"):
+        ax = plt.gca()
+        sns.boxplot(x=x_label, y='Rounds to Convergence',
+                    hue='Algorithm', data=data, palette=colours, ax=ax)
+
+    if mean_line:
+        # Mean of every box, dashed across the x positions of its algorithm
+        positions = sorted(set(data[x_label]))
+        width = 0.8 / len(results)
+        for index, (_, label) in enumerate(results):
+            rounds = {x: [] for x in positions}
+            for x, value, algorithm in zip(*data.values()):
+                if algorithm == label:
+                    rounds[x].append(value)
+            offset = (index - (len(results) - 1) / 2) * width
+            points = [(i + offset, statistics.mean(rounds[x]))
+                      for i, x in enumerate(positions) if rounds[x]]
+            ax.plot(*zip(*points), marker='o', linestyle='--', linewidth=2, markersize=6,
+                    color=colours[index] if colours else None)
+
+    plt.xlabel(x_label)
+    plt.ylabel('Rounds to Convergence')
+    plt.legend(loc='upper left')
+
+
+def draw_average_rounds(plt, path):
+    """Bar graph of the average rounds to consensus of every configuration of a simulation summary."""
+    # Configurations without a terminated run have no average
+    data = [entry for entry in load_results(path)
+            if entry['summary']['average_rounds'] is not None]
+    configurations = [f"N={entry['configuration']['N']}" for entry in data]
+    average_rounds = [entry['summary']['average_rounds'] for entry in data]
+
+    plt.bar(configurations, average_rounds, color='skyblue')
+    plt.xlabel('Configuration (Number of Vehicles, N)')
+    plt.ylabel('Average Rounds to Reach Consensus')
+    plt.title('Average Rounds to Reach Consensus for Different Vehicle Numbers (N)')
+    plt.grid(axis='y', linestyle='--')
+
+
+def configuration_label(configuration):
+    return f"N={configuration['N']}, f={configuration['f']}"
+
+
+def draw_consensus_boxplot(plt, path):
+    """Box plot of the rounds to reach consensus of every configuration of a simulation summary.
+
+    Older simulation lists, one entry per run with a simulation_id, are grouped
+    by the configuration number of the id.
+    """
+    rounds_by_config = {}
+    for entry in load_results(path):
+        if 'runs' in entry:
+            config_key = configuration_label(entry['configuration'])
+            runs = entry['runs']
+        else:
+            config_key = f"Config {entry['simulation_id'].split('_')[0]}"
+            runs = [entry]
+        rounds = rounds_by_config.setdefault(config_key, [])
+        # Runs that did not reach consensus have no rounds
+        rounds.extend(run['rounds_to_reach_consensus'] for run in runs
+                      if run['rounds_to_reach_consensus'] is not None)
+
+    plt.boxplot(list(rounds_by_config.values()), patch_artist=True,
+                boxprops=dict(facecolor='lightblue', color='black'),
+                whiskerprops=dict(color='black'),
+                capprops=dict(color='black'),
+                medianprops=dict(color='red'))
+    plt.xticks(range(1, len(rounds_by_config) + 1), list(rounds_by_config))
+    plt.title('Distribution of Rounds to Reach Consensus for Each Configuration')
+    plt.xlabel('Configuration')
+    plt.ylabel('Rounds to Reach Consensus')
+    plt.grid(True)
+
+
+def draw_message_loss(plt, path):
+    """Messages lost per round, one line per run of a simulation summary or list, or for a single run."""
+    data = load_results(path)
+    if isinstance(data, dict):
+        tracking = data['message_loss_tracking']
+        plt.plot(range(len(tracking)), tracking, marker='o')
+        plt.title('Message Loss Per Round')
+    else:
+        for entry in data:
+            if 'runs' in entry:
+                for run in entry['runs']:
+                    tracking = run['message_losses_per_round']
+                    plt.plot(range(len(tracking)), tracking, marker='o',
+                             label=f"{configuration_label(entry['configuration'])}, run {run['run_number']}")
+            else:
+                tracking = entry['message_loss_tracking']
+                plt.plot(range(len(tracking)), tracking, marker='o',
+                         label=f"Simulation {entry['simulation_id']}")
+        plt.title('Message Loss Per Round for Each Simulation Configuration')
+        plt.legend(loc='upper right', bbox_to_anchor=(1.15, 1), title="Simulations")
+    plt.xlabel('Round')
+    plt.ylabel('Messages Lost')
+    plt.grid(True)
+    plt.tight_layout()
+
+
+def draw(plt, figure, results, mean_line=False):
+    """Draw the figure type on a new figure from the (path, label) results files."""
+    plt.figure(figsize=(10, 6))
+    if figure in ROUND_AXES:
+        draw_rounds(plt, figure, results, mean_line=mean_line)
+    elif figure == 'average-rounds':
+        draw_average_rounds(plt, results[0][0])
+    elif figure == 'consensus-boxplot':
+        draw_consensus_boxplot(plt, results[0][0])
+    else:
+        draw_message_loss(plt, results[0][0])
+
+
+def finish(plt, output, show=False, dpi=None):
+    """Show the current figure or save it to output, then close it."""
+    if show:
+        plt.show()
+    else:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        plt.savefig(output, dpi=dpi)
+        print(f"Saved {output}")
+    plt.close()
+
+
+def plot(figure, results, output, show=False, mean_line=False, dpi=None):
+    """Draw the figure type from the (path, label) results files, then show it or save it to output."""
+    plt = pyplot(show)
+    draw(plt, figure, results, mean_line=mean_line)
+    finish(plt, output, show=show, dpi=dpi)
+
+
+def plot_all(input_dir='.', output_dir='plots', dpi=None):
+    """Save every figure of FIGURES whose results files are in input_dir and return the saved paths."""
+    plt = None
+    saved = []
+    for figure, results, output in FIGURES:
+        results = [(os.path.join(input_dir, path), label) for path, label in results]
+        missing = [path for path, _ in results if not os.path.exists(path)]
+        if missing:
+            print(f"Skipped {output}, missing {', '.join(missing)}")
+            continue
+        plt = plt or pyplot()
+        draw(plt, figure, results)
+        finish(plt, os.path.join(output_dir, output), dpi=dpi)
+        saved.append(os.path.join(output_dir, output))
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Draw the figures of the results files.")
+    subcommands = parser.add_subparsers(dest='figure', required=True)
+
+    for axis, (x_label, _) in ROUND_AXES.items():
+        command = subcommands.add_parser(
+            axis, help=f"Box plot of the rounds to convergence against {x_label.split(' (')[0].lower()}")
+        command.add_argument('results', nargs='+', type=results_file, metavar='PATH[:LABEL]',
+                             help="Results files, one box per file and x value")
+        command.add_argument('--mean-line', action='store_true',
+                             help="Join the means of the boxes of every algorithm")
+    for figure, description in [('average-rounds', "Bar graph of the average rounds of a simulation summary"),
+                                ('consensus-boxplot', "Box plot of the rounds to consensus of a simulation summary"),
+                                ('message-loss', "Messages lost per round of a simulation summary or run")]:
+        command = subcommands.add_parser(figure, help=description)
+        command.add_argument('results', type=results_file, metavar='PATH',
+                             help="Results file")
+    for command in subcommands.choices.values():
+        command.add_argument('--output', default=None,
+                             help="Image file (default: FIGURE.png)")
+        command.add_argument('--show', action='store_true',
+                             help="Open the figure in a window instead of saving it")
+    everything = subcommands.add_parser(
+        'all', help="Save every figure whose results files exist")
+    everything.add_argument('--input-dir', default='.',
+                            help="Directory of the results files")
+    everything.add_argument('--output-dir', default='plots',
+                            help="Directory the images are saved to")
+    for command in subcommands.choices.values():
+        command.add_argument('--dpi', type=float, default=None,
+                             help="Resolution of the saved images (default: matplotlib's)")
+    args = parser.parse_args()
+
+    if args.figure == 'all':
+        plot_all(args.input_dir, args.output_dir, dpi=args.dpi)
+    else:
+        results = args.results if isinstance(args.results, list) else [args.results]
+        plot(args.figure, results, args.output or f'{args.figure}.png', show=args.show,
+             mean_line=getattr(args, 'mean_line', False), dpi=args.dpi)
@@ -0,0 +1,48 @@
+import random
+
+
+def master_seed():
+    """Draw a fresh master seed for a sweep."""
+    return random.SystemRandom().getrandbits(63)
+
+
+def spawn_seeds(master_seed):
+    """Yield the per-run seeds of a sweep, the same master seed gives the same seeds."""
+    stream = random.Random(master_seed)
+    while True:
+        yield stream.getrandbits(63)
+
+
+def make_rng(seed):
+    """Generator of one run, replaying a seed reproduces the run."""
+    return random.Random(seed)
+
+
+class ReplicaGenerators:
+    """NumPy generators of the replicas of a batched engine, one per seed.
+
+    Stands in for the generator of a vectorized_*.py engine: a draw whose first
+    axis is the replicas takes row b from the generator of replica b. A replica
+    thus draws the same numbers whatever the other replicas of its batch, and
+    run_batched(config, 1, rng=ReplicaGenerators([seed])) replays it alone.
+    """
+
+    def __init__(self, seeds):
+        import numpy as np
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+        self.stack = np.stack
+
+    def keep(self, mask):
+        """Drop the generators of the replicas not selected by mask."""
+        self.generators = [generator for generator, kept in zip(self.generators, mask) if kept]
+
+    def random(self, size):
+        return self.stack([generator.random(size[1:]) for generator in self.generators])
+
+    def integers(self, low, high, size):
+        return self.stack([generator.integers(low, high, size[1:]) for generator in self.generators])
+
+    def permuted(self, x, axis):
+        """Rows of x permuted along axis, which must not be the replica axis."""
+        return self.stack([generator.permuted(row, axis=axis if axis < 0 else axis - 1)
+                           for generator, row in zip(self.generators, x)])
@@ -0,0 +1,301 @@
+"""Multi-process DAC engine for a single very large run.
+
+Batching replicas (vectorized_*.py) does not help one run with tens of
+thousands of nodes. SharedMemoryDACAlgorithm splits the receivers of one run
+across worker processes instead. Node values, phases, min / max values and the
+received bit vectors R live in multiprocessing.shared_memory arrays, every
+worker owns a contiguous slice of receivers and processes it against the same
+broadcast snapshot, and a barrier separates the rounds.
+
+Within a slice the per-node rules of DACAlgorithm.run are applied to blocks of
+receivers as array operations: with all messages of a round in hand, the phase
+of a node ends at the highest phase it hears of, its last jump is the first
+message of that phase (messages from senders already in R come first), and
+only the messages of that phase after the jump are recorded.
+"""
+import json
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import seeding
+import tracing
+from bitset import BitVector
+from Consensus_with_DAC_algorithm import MAX_ROUNDS, DACAlgorithm
+
+# Receivers whose messages are drawn and processed together, the memory of a
+# block is a few block_size x N arrays
+BLOCK_SIZE = 128
+
+
+def _create(n):
+    """Shared memory blocks of the run state, the layout to attach them and the arrays."""
+    words = (n + 7) // 8
+    specs = {
+        'value': ((n,), 'float64'),
+        'phase': ((n,), 'int64'),
+        'min_value': ((n,), 'float64'),
+        'max_value': ((n,), 'float64'),
+        'faulty': ((n,), 'bool'),
+        # Broadcast snapshot of the round, every message carries the state of its sender at broadcast time
+        'sent_value': ((n,), 'float64'),
+        'sent_phase': ((n,), 'int64'),
+        # R of every node packed as bits, bit j of row i is set when node i received from node j
+        'R': ((n, words), 'uint8'),
+        'stop': ((1,), 'bool'),
+    }
+    blocks, layout, state = [], {}, {}
+    for name, (shape, dtype) in specs.items():
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        blocks.append(block)
+        layout[name] = (block.name, shape, dtype)
+        state[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, layout, state
+
+
+def _attach(layout):
+    """Attach the shared memory blocks of a layout made by _create."""
+    blocks, state = [], {}
+    for name, (block_name, shape, dtype) in layout.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        state[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return blocks, state
+
+
+def process_block(state, rows, delivered, pend, quorum):
+    """Apply the messages delivered to the receivers `rows`, as DACAlgorithm.run does node by node.
+
+    delivered[k, j] is True when node rows[k] received the message of node j this
+    round. The rows must be correct nodes below pend, the others do not update.
+    """
+    n = len(state['value'])
+    senders = np.arange(n)
+    own = senders == rows[:, np.newaxis]
+    sent_value = state['sent_value']
+    sent_phase = state['sent_phase']
+    phase = state['phase'][rows]
+    value = state['value'][rows]
+    min_value = state['min_value'][rows]
+    max_value = state['max_value'][rows]
+    received = np.unpackbits(
+        state['R'][rows], axis=1, count=n, bitorder='little').astype(bool)
+
+    # Every message of a higher phase is a jump, the last one is the first message of the highest phase
+    highest = np.maximum(phase, np.where(
+        delivered, sent_phase, -1).max(axis=1))
+    jumps = highest > phase
+    in_highest = delivered & (sent_phase == highest[:, np.newaxis])
+    from_received = in_highest & received
+    received_first = from_received.any(axis=1)
+    jump_sender = np.where(received_first, from_received.argmax(
+        axis=1), in_highest.argmax(axis=1))
+
+    # Messages visited after the jump: later senders of R, then the others, each group in sender order
+    after = senders > jump_sender[:, np.newaxis]
+    later = np.where(received_first[:, np.newaxis],
+                     (received & after) | ~received, ~received & after)
+    recorded = in_highest & np.where(jumps[:, np.newaxis], later, ~received)
+
+    jump_value = sent_value[jump_sender]
+    value = np.where(jumps, jump_value, value)
+    min_value = np.minimum(np.where(jumps, jump_value, min_value), np.where(
+        recorded, sent_value, np.inf).min(axis=1))
+    max_value = np.maximum(np.where(jumps, jump_value, max_value), np.where(
+        recorded, sent_value, -np.inf).max(axis=1))
+    received = np.where(jumps[:, np.newaxis], own, received) | recorded
+    phase = highest
+
+    advance = (received.sum(axis=1) >= quorum) & (phase < pend)
+    value = np.where(advance, (min_value + max_value) / 2, value)
+    min_value = np.where(advance, value, min_value)
+    max_value = np.where(advance, value, max_value)
+    phase = phase + advance
+    received[advance] = own[advance]
+
+    state['value'][rows] = value
+    state['phase'][rows] = phase
+    state['min_value'][rows] = min_value
+    state['max_value'][rows] = max_value
+    state['R'][rows] = np.packbits(received, axis=1, bitorder='little')
+
+
+def _worker(layout, start, stop, seed, message_loss_rate, pend, quorum, barrier):
+    """Process the receivers start..stop-1 every round until the coordinator sets the stop flag."""
+    blocks, state = _attach(layout)
+    try:
+        rng = np.random.default_rng(seed)
+        n = len(state['value'])
+        # Crashed nodes do not broadcast
+        senders = ~state['faulty']
+        while True:
+            barrier.wait()  # Round start, the snapshot is taken
+            if state['stop'][0]:
+                break
+            for block_start in range(start, stop, BLOCK_SIZE):
+                rows = np.arange(block_start, min(block_start + BLOCK_SIZE, stop))
+                rows = rows[~state['faulty'][rows] &
+                            (state['phase'][rows] != pend)]
+                if len(rows) == 0:
+                    continue
+                delivered = rng.random(
+                    (len(rows), n)) >= message_loss_rate
+                delivered &= senders
+                delivered[np.arange(len(rows)), rows] = False
+                process_block(state, rows, delivered, pend, quorum)
+            barrier.wait()  # Round done
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        state.clear()
+        for block in blocks:
+            block.close()
+
+
+class SharedMemoryDACAlgorithm(DACAlgorithm):
+    """DACAlgorithm whose run() spreads the receivers over worker processes.
+
+    Nodes are set up as in DACAlgorithm and hold the final state after run().
+    Message losses are drawn by the workers, a run is reproducible from the
+    generator seed and the number of workers. Broadcasts are all-to-all, and
+    tracing only emits round events.
+    """
+
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon, rng=None,
+                 workers=None):
+        super().__init__(total_nodes, num_faulty_nodes,
+                         message_loss_rate, initial_ratio, epsilon, rng=rng)
+        self.workers = max(1, min(workers or os.cpu_count(), total_nodes))
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """Run the DAC algorithm and count the number of rounds to termination, None past max_rounds."""
+        n = self.total_nodes
+        blocks, layout, state = _create(n)
+        try:
+            for node in self.nodes:
+                state['value'][node.id] = node.value
+                state['phase'][node.id] = node.phase
+                state['min_value'][node.id] = node.min_value
+                state['max_value'][node.id] = node.max_value
+                state['faulty'][node.id] = node.faulty
+                state['R'][node.id] = np.frombuffer(
+                    node.R.bits.to_bytes(state['R'].shape[1], 'little'), dtype=np.uint8)
+            state['stop'][0] = False
+
+            context = multiprocessing.get_context()
+            barrier = context.Barrier(self.workers + 1)
+            seeds = np.random.SeedSequence(
+                self.rng.getrandbits(63)).spawn(self.workers)
+            bounds = np.linspace(0, n, self.workers + 1).astype(int)
+            processes = [context.Process(target=_worker, args=(
+                layout, int(bounds[k]), int(bounds[k + 1]), seeds[k], self.message_loss_rate,
+                self.pend, n // 2 + 1, barrier)) for k in range(self.workers)]
+            for process in processes:
+                process.start()
+
+            try:
+                rounds = 0
+                while True:
+                    rounds += 1
+                    if tracing.level <= tracing.INFO:
+                        tracing.emit(tracing.ROUND, rounds)
+                    if np.all(state['faulty'] | (state['phase'] == self.pend)):
+                        print(
+                            f"All nodes reached termination after {rounds} rounds.")
+                        break
+                    if rounds > max_rounds:
+                        print(
+                            f"Nodes did not reach termination within {max_rounds} rounds.")
+                        rounds = None
+                        break
+                    state['sent_value'][:] = state['value']
+                    state['sent_phase'][:] = state['phase']
+                    barrier.wait()
+                    barrier.wait()
+                state['stop'][0] = True
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                raise RuntimeError(
+                    "A worker of the shared-memory DAC engine failed") from None
+            finally:
+                for process in processes:
+                    process.join()
+
+            self.store_state(state)
+            return rounds
+        finally:
+            state.clear()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def store_state(self, state):
+        """Copy the shared arrays back into the nodes."""
+        for node in self.nodes:
+            node.value = float(state['value'][node.id])
+            node.phase = int(state['phase'][node.id])
+            node.min_value = float(state['min_value'][node.id])
+            node.max_value = float(state['max_value'][node.id])
+            node.R = BitVector(int.from_bytes(
+                state['R'][node.id].tobytes(), 'little'))
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+    workers = os.cpu_count()
+
+    configurations = [
+        {'N': 20000, 'f': 6000, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+        {'N': 20000, 'f': 6000, 'message_loss_rate': 0.3,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+    ]
+
+    # Every run draws from its own generator, the seed and the worker count are stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []
+
+    for config in configurations:
+        for _ in range(num_runs):
+            seed = next(seeds)
+            print(
+                f"\nRunning shared-memory DAC on {workers} workers with configuration: {config}")
+            try:
+                dac = SharedMemoryDACAlgorithm(
+                    total_nodes=config['N'],
+                    num_faulty_nodes=config['f'],
+                    message_loss_rate=config['message_loss_rate'],
+                    initial_ratio=config['initial_ratio'],
+                    epsilon=config['epsilon'],
+                    rng=seeding.make_rng(seed),
+                    workers=workers
+                )
+            except ValueError as error:
+                # Quorums out of reach, the same for every run of the configuration
+                print(f"Skipping configuration {config}: {error}")
+                break
+            rounds = dac.run()
+
+            # Same record layout as Consensus_with_DAC_algorithm.py
+            result = {
+                'config': config,
+                'rounds': rounds,
+                'num_nodes': config['N'],
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed,
+                'workers': workers
+            }
+            results.append(result)
+
+    # Write results to JSON file
+    with open('Shared_Memory_DAC_Results.json', 'w') as f:
+        json.dump(results, f, indent=4)
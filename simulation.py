@@ -1,17 +1,82 @@
 import random
 import numpy as np
 import json_file
-from vehicles import Vehicle
-
-
-def consensus_simulation(total_vehicles, total_rounds, message_loss_rate, epsilon_value, f, byzantine_vehicles=None):
+import seeding
+import tracing
+from adversary import payload as adversary_payload
+from node_store import store_backed
+from vehicles import STORED_FIELDS, Vehicle
+
+
+def trimmed_means(states, f):
+    """Mean of every row without its f smallest and f largest entries.
+
+    Uses partition-based selection instead of a full sort, the kept entries are
+    the ones Vehicle.trim_states keeps (the sums can differ in the last bits
+    because they are added in a different order).
+    """
+    n = states.shape[1]
+    if f == 0:
+        return states.mean(axis=1)
+    kept = np.partition(states, (f - 1, n - f), axis=1)[:, f:n - f]
+    return kept.mean(axis=1)
+
+
+def receive_into(vehicles):
+    """N x N array of the states the vehicles receive, row i is the received_states of vehicle i.
+
+    Vehicle.receive_state writes into the row of the receiver, the entries of the
+    senders it did not hear from keep its own state.
+    """
+    states = np.array([vehicle.current_state for vehicle in vehicles], dtype=float)
+    received = np.repeat(states[:, np.newaxis], len(vehicles), axis=1)
+    for vehicle, row in zip(vehicles, received):
+        vehicle.received_states = row
+    return received
+
+
+def update_states(vehicles, f, received):
+    """Trimmed-mean update of all vehicles in one pass, batched Vehicle.update_state.
+
+    received is the array of receive_into(vehicles), refilled with the new
+    states for the next round.
+    """
+    states = trimmed_means(received, f)
+    received[:] = states[:, np.newaxis]
+
+    for vehicle, state in zip(vehicles, states):
+        vehicle.current_state = float(state)
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.STATE_UPDATE,
+                         vehicle.vehicle_id, vehicle.current_state)
+
+
+def consensus_simulation(total_vehicles, total_rounds, message_loss_rate, epsilon_value, f, byzantine_vehicles=None, rng=None, topology=None,
+                         mobility=None, adversary=None, store=False):
+    if mobility is not None and topology is None:
+        raise ValueError("A mobility model moves the vehicles of a topology, pass a topology too")
+    if mobility is not None and topology.positions != list(mobility.positions):
+        raise ValueError(
+            "The topology does not start from the positions of the mobility model, "
+            "build it with GridTopology.from_mobility")
+    # Generator of this run, the global random module unless a seeded one is given
+    rng = random if rng is None else rng
+    # With store=True the STORED_FIELDS of the vehicles live in a node_store.NodeStore
+    vehicle_class = store_backed(
+        Vehicle, total_vehicles, 'vehicle_id', STORED_FIELDS) if store else Vehicle
+    byzantine_vehicles = set(byzantine_vehicles)
+    # Optional adversary.STRATEGIES name replacing the random 0/1 states of the Byzantine vehicles
+    if adversary is not None:
+        adversary_rng = np.random.default_rng(rng.getrandbits(63))
+        byzantine_ids = sorted(byzantine_vehicles)
     # Initialize vehicles with given parameters
     vehicles = [
-        Vehicle(
+        vehicle_class(
             vehicle_id=i,
-            initial_state=random.randint(0, 1),
+            initial_state=rng.randint(0, 1),
             epsilon=epsilon_value,
-            is_byzantine=(i in byzantine_vehicles)
+            is_byzantine=(i in byzantine_vehicles),
+            rng=rng
         ) for i in range(total_vehicles)
     ]
 
@@ -19,32 +84,59 @@ def consensus_simulation(total_vehicles, total_rounds, message_loss_rate, epsilo
     inconclusive_count = 0
     final_decisions = []  # Initialize list to track final decisions
     rounds_to_reach_consensus = None
+    neighbour_changes_per_round = []  # Vehicles whose neighbours changed, with a mobility model
+    if topology is None:
+        received = receive_into(vehicles)
 
     # Simulate rounds of message passing and state updating
     for current_round in range(total_rounds):
-        print(f"\n--- Round {current_round + 1} ---")
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.ROUND, current_round + 1)
         round_message_losses = 0  # Initialize counter for message losses in this round
         inconclusive_count = 0  # Initialize counter for inconclusive decisions
 
-        # Each vehicle broadcasts its state to all other vehicles
+        payloads = {}
+        if adversary is not None:
+            # Values every Byzantine vehicle sends this round, vehicles have no phases
+            payload = adversary_payload(
+                adversary, adversary_rng, np.zeros(total_vehicles),
+                [vehicle.current_state for vehicle in vehicles],
+                np.zeros(len(byzantine_ids)), binary=True)
+            payloads = dict(zip(byzantine_ids, payload.T))
+
+        # Each vehicle broadcasts its state to all other vehicles, or with a
+        # topology.GridTopology only to the vehicles in its radio range
         for vehicle in vehicles:
+            if topology is None:
+                recipients = vehicles
+            else:
+                recipients = [vehicles[i]
+                              for i in topology.neighbours(vehicle.vehicle_id)]
             # Count message losses for each vehicle and add to the round's total
             round_message_losses += vehicle.broadcast_state(
-                vehicles, message_loss_rate)
+                recipients, message_loss_rate, payloads.get(vehicle.vehicle_id))
 
         # Record message losses for the round
         message_losses_per_round.append(round_message_losses)
 
         # Update state for each vehicle
-        for vehicle in vehicles:
-            vehicle.update_state(total_vehicles, f)
+        if topology is None:
+            update_states(vehicles, f, received)
+        else:
+            # Trim within the neighbourhood, keeping at least the vehicle's own state
+            for vehicle in vehicles:
+                neighbourhood = len(topology.neighbours(vehicle.vehicle_id)) + 1
+                vehicle.update_state(
+                    neighbourhood, min(f, (neighbourhood - 1) // 2))
+
+        if mobility is not None:
+            # Vehicles move between rounds, only crossing vehicles are re-bucketed
+            neighbour_changes = topology.move(mobility.step())
+            neighbour_changes_per_round.append(len(neighbour_changes))
 
         # **After each round**, check for convergence among correct vehicles
         correct_vehicle_states = [
             v.current_state for v in vehicles if not v.is_byzantine]
-        print(f"Correct_vehicle_states: {correct_vehicle_states}")
-        print(f"max: {max(correct_vehicle_states)}")
-        print(f"min: {min(correct_vehicle_states)}")
         if max(correct_vehicle_states) - min(correct_vehicle_states) <= (epsilon_value*100):
             # Multipy epsilon value to 10 or 100 to early converged
             rounds_to_reach_consensus = current_round + 1
@@ -65,16 +157,153 @@ def consensus_simulation(total_vehicles, total_rounds, message_loss_rate, epsilo
             inconclusive_count += 1
 
     # Prepare the results dictionary to return
-    return {
+    result = {
         'rounds_to_reach_consensus': rounds_to_reach_consensus,
         'initial_binary_states': [vehicle.initial_state for vehicle in vehicles],
         'inconclusive_count': inconclusive_count,
         'message_losses_per_round': message_losses_per_round,
         'final_decisions': [final_decisions]
     }
+    if mobility is not None:
+        result['neighbour_changes_per_round'] = neighbour_changes_per_round
+    return result
+
+
+def vectorized_consensus_simulation(total_vehicles, total_rounds, message_loss_rate, epsilon_value, f, byzantine_vehicles=None, rng=None,
+                                    adversary=None):
+    """Array-based consensus_simulation with the same arguments and result.
+
+    The states of all vehicles are one vector. Every round draws the message
+    losses as a mask and the Byzantine equivocation as a random 0/1 matrix, and
+    updates all vehicles with trimmed_means. It draws from a different random
+    stream than consensus_simulation, the distribution of the results is the same.
+    """
+    # Generator of this run, the global random module unless a seeded one is given
+    rng = random if rng is None else rng
+    # NumPy generator seeded from the run's generator, so a run seed still reproduces the run
+    np_rng = np.random.default_rng(rng.getrandbits(63))
+
+    byzantine = np.zeros(total_vehicles, dtype=bool)
+    byzantine[list(byzantine_vehicles)] = True
+    initial_states = np_rng.integers(0, 2, total_vehicles)
+    states = initial_states.astype(float)
+    links = ~np.eye(total_vehicles, dtype=bool)
+
+    message_losses_per_round = []  # Initialize list to track message losses per round
+    rounds_to_reach_consensus = None
+
+    for current_round in range(total_rounds):
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.ROUND, current_round + 1)
+
+        # Entry [i, j] is what vehicle i receives from vehicle j, Byzantine vehicles
+        # send every recipient a random state and missing states are filled with the
+        # receiver's own state
+        delivered = (np_rng.random(
+            (total_vehicles, total_vehicles)) > message_loss_rate) & links
+        message_losses_per_round.append(
+            int(links.sum() - delivered.sum()))
+        if adversary is None:
+            sent = np.where(byzantine, np_rng.integers(
+                0, 2, (total_vehicles, total_vehicles)), states)
+        else:
+            sent = np.repeat(states[np.newaxis, :], total_vehicles, axis=0)
+            sent[:, byzantine] = adversary_payload(
+                adversary, np_rng, np.zeros(total_vehicles), states,
+                np.zeros(byzantine.sum()), binary=True)
+            # Omitted messages are missing like lost ones, without counting as losses
+            delivered &= ~np.isnan(sent)
+        states = trimmed_means(
+            np.where(delivered, sent, states[:, np.newaxis]), f)
+
+        if tracing.level <= tracing.INFO:
+            for vehicle_id, state in enumerate(states):
+                tracing.emit(tracing.STATE_UPDATE, vehicle_id, state)
+
+        # After each round, check for convergence among correct vehicles
+        correct_vehicle_states = states[~byzantine]
+        if correct_vehicle_states.max() - correct_vehicle_states.min() <= (epsilon_value*100):
+            rounds_to_reach_consensus = current_round + 1
+            print(f"Consensus reached at round {rounds_to_reach_consensus}")
+            break
 
+    else:
+
+        # If no convergence is reached within the total rounds
+        print("Consensus not reached within the specified rounds.")
+
+    # Decide the final output of each vehicle, as Vehicle.decide_final_output
+    final_decisions = np.select(
+        [states < 0.5 - epsilon_value / 2, states > 0.5 + epsilon_value / 2], [0, 1], -1).tolist()
+    final_decisions = [None if decision == -1 else decision
+                       for decision in final_decisions]
+    if tracing.level <= tracing.INFO:
+        for vehicle_id, decision in enumerate(final_decisions):
+            tracing.emit(tracing.DECISION, vehicle_id, decision)
+
+    return {
+        'rounds_to_reach_consensus': rounds_to_reach_consensus,
+        'initial_binary_states': initial_states.tolist(),
+        'inconclusive_count': final_decisions.count(None),
+        'message_losses_per_round': message_losses_per_round,
+        'final_decisions': [final_decisions]
+    }
+
+
+# Simulation engines selectable in run_simulations_and_store_results
+ENGINES = {
+    'python': consensus_simulation,
+    'vectorized': vectorized_consensus_simulation,
+}
+
+
+def run_record(run_number, result, seed=None):
+    """Per-run record stored in the results file."""
+    return {
+        'run_number': run_number,
+        'seed': seed,
+        'rounds_to_reach_consensus': result['rounds_to_reach_consensus'],
+        'initial_binary_states': result['initial_binary_states'],
+        'inconclusive_outputs': result['inconclusive_count'],
+        'message_losses_per_round': result['message_losses_per_round'],
+        'final_decisions': result['final_decisions']
+    }
+
+
+def summarize_runs(config, runs_data):
+    """Group the runs of one configuration with their average and 99th percentile rounds."""
+    all_rounds = [run['rounds_to_reach_consensus'] for run in runs_data]
+    # Filter out None values from all_rounds
+    valid_rounds = [round for round in all_rounds if round is not None]
+
+    # Calculate average and 99th percentile only for valid rounds
+    average_rounds = np.mean(valid_rounds) if valid_rounds else None
+    percentile_99 = np.percentile(
+        valid_rounds, 99) if valid_rounds else None
+
+    return {
+        'configuration': config,
+        'summary': {
+            'average_rounds': average_rounds,
+            '99th_percentile_rounds': percentile_99
+        },
+        'runs': runs_data
+    }
+
+
+def run_simulations_and_store_results(configurations, output_file, engine='python', adversary=None):
+    """Run every configuration with the engine named in ENGINES and store the grouped results.
+
+    adversary names the adversary.STRATEGIES entry of the Byzantine vehicles, a
+    random 0 or 1 per message when None.
+    """
+    simulate = ENGINES[engine]
+
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
 
-def run_simulations_and_store_results(configurations, output_file):
     results = []
 
     for config in configurations:
@@ -96,70 +325,48 @@ def run_simulations_and_store_results(configurations, output_file):
         runs_data = []
 
         for repeat_index in range(num_repeats):
+            seed = next(seeds)
+            rng = seeding.make_rng(seed)
             print(
                 f"\n--- Running Repeat {repeat_index + 1} for Configuration {config} ---")
-            result = consensus_simulation(
+            result = simulate(
                 N, total_rounds=10, message_loss_rate=message_loss_rate,
-                epsilon_value=epsilon_value, f=f, byzantine_vehicles=random.sample(
-                    range(N), f)
+                epsilon_value=epsilon_value, f=f, byzantine_vehicles=rng.sample(
+                    range(N), f), rng=rng, adversary=adversary
             )
 
-            run_result = {
-                'run_number': repeat_index + 1,
-                'rounds_to_reach_consensus': result['rounds_to_reach_consensus'],
-                'initial_binary_states': result['initial_binary_states'],
-                'inconclusive_outputs': result['inconclusive_count'],
-                'message_losses_per_round': result['message_losses_per_round'],
-                'final_decisions': result['final_decisions']
-            }
-
-            runs_data.append(run_result)
+            runs_data.append(run_record(repeat_index + 1, result, seed))
             print(
                 f"Rounds to reach consensus for repeat {repeat_index + 1}: {result['rounds_to_reach_consensus']}")
 
-        all_rounds = [run['rounds_to_reach_consensus'] for run in runs_data]
-        # average_rounds = np.mean(all_rounds)
-        # percentile_99 = np.percentile(all_rounds, 99)
-        # Filter out None values from all_rounds
-        valid_rounds = [round for round in all_rounds if round is not None]
-
-        # Calculate average and 99th percentile only for valid rounds
-        average_rounds = np.mean(valid_rounds) if valid_rounds else None
-        percentile_99 = np.percentile(
-            valid_rounds, 99) if valid_rounds else None
-
-        result_summary = {
-            'configuration': config,
-            'summary': {
-                'average_rounds': average_rounds,
-                '99th_percentile_rounds': percentile_99
-            },
-            'runs': runs_data
-        }
-
+        result_summary = summarize_runs(config, runs_data)
         results.append(result_summary)
 
         print(
             f"\nResults for Configuration: N={N}, f={f}, message_loss_rate={message_loss_rate}, initial_ratio={initial_ratio}")
-        print(f"Average Rounds to Reach Consensus: {average_rounds}")
-        print(f"99th Percentile Rounds to Reach Consensus: {percentile_99}")
-        print(f"All Rounds to Reach Consensus: {all_rounds}\n")
+        print(
+            f"Average Rounds to Reach Consensus: {result_summary['summary']['average_rounds']}")
+        print(
+            f"99th Percentile Rounds to Reach Consensus: {result_summary['summary']['99th_percentile_rounds']}")
+        print(
+            f"All Rounds to Reach Consensus: {[run['rounds_to_reach_consensus'] for run in runs_data]}\n")
 
     json_file.save_result_to_json(results, output_file)
 
 
-configurations = [
+if __name__ == "__main__":
+    configurations = [
 
-    {'N': 20, 'f': 4, 'message_loss_rate': 0.5,
-        'initial_ratio': 0.7, 'epsilon': 0.00001},
+        {'N': 20, 'f': 4, 'message_loss_rate': 0.5,
+            'initial_ratio': 0.7, 'epsilon': 0.00001},
 
-    # {'N': 20, 'f': 1, 'message_loss_rate': 0.1,
-    #     'initial_ratio': 0.7, 'epsilon': 0.01},
+        # {'N': 20, 'f': 1, 'message_loss_rate': 0.1,
+        #     'initial_ratio': 0.7, 'epsilon': 0.01},
 
-    # {'N': 25, 'f': 1, 'message_loss_rate': 0.1,
-    #     'initial_ratio': 0.7, 'epsilon': 0.01}
+        # {'N': 25, 'f': 1, 'message_loss_rate': 0.1,
+        #     'initial_ratio': 0.7, 'epsilon': 0.01}
 
-]
+    ]
 
-run_simulations_and_store_results(
-    configurations, output_file='simulation_results.json')
+    run_simulations_and_store_results(
+        configurations, output_file='simulation_results.json')
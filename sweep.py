@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import json_file
+import seeding
+import tracing
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Algorithm name -> (script, entry point, results file written by the script)
+ALGORITHMS = {
+    'DAC': ('Consensus_with_DAC_algorithm.py', 'DACAlgorithm', 'DAC_Algorithm_Results.json'),
+    'Early-DAC': ('Early-DAC.py', 'DACAlgorithm', 'Early-DAC_AlgoResults.json'),
+    'Tunable Early-DAC(5)': ('Tunable_Early-Dac(5).py', 'DACAlgorithm', 'Tunable_Early-DAC(5)_AlgoResults.json'),
+    'EarlyDAC': ('Early_DAC_ALGO.py', 'EarlyDACAlgorithm', 'Early_DAC_Algorithm_Results.json'),
+    'DBAC': ('DBACAlgorithm.py', 'DBACAlgorithm', 'dbac_results.json'),
+    # Same algorithms with the Numba kernels of numba_backend.py, the Python classes without Numba
+    'EarlyDAC-compiled': ('numba_backend.py', 'CompiledEarlyDACAlgorithm', 'Early_DAC_Algorithm_Results.json'),
+    'DBAC-compiled': ('numba_backend.py', 'CompiledDBACAlgorithm', 'dbac_results.json'),
+    'AC': ('AC.py', 'ACAlgorithm', 'AC_Algorithm_Results.json'),
+    'simulation': ('simulation.py', 'consensus_simulation', 'simulation_results.json'),
+}
+
+_loaded_scripts = {}
+
+
+def load_script(filename):
+    """Import an algorithm script by file name, the names are not all valid module names."""
+    if filename not in _loaded_scripts:
+        module_name = os.path.splitext(filename)[0].replace(
+            '-', '_').replace('(', '_').replace(')', '_')
+        spec = importlib.util.spec_from_file_location(
+            module_name, os.path.join(SCRIPT_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_scripts[filename] = module
+    return _loaded_scripts[filename]
+
+
+def run_job(algorithm, config, run_number, seed, quiet=True):
+    """Run one (configuration, replica) job and return its per-run record."""
+    script, entry_point, _ = ALGORITHMS[algorithm]
+    module = load_script(script)
+    rng = seeding.make_rng(seed)
+
+    with contextlib.ExitStack() as stack:
+        # Pool workers exit without atexit handlers, the events of the job are written now
+        stack.callback(tracing.flush)
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(
+                stack.enter_context(open(os.devnull, 'w'))))
+
+        if algorithm == 'simulation':
+            result = module.consensus_simulation(
+                config['N'], total_rounds=10, message_loss_rate=config['message_loss_rate'],
+                epsilon_value=config['epsilon'], f=config['f'],
+                byzantine_vehicles=rng.sample(range(config['N']), config['f']),
+                rng=rng, adversary=config.get('adversary')
+            )
+            return module.run_record(run_number, result, seed)
+
+        algorithm_class = getattr(module, entry_point)
+        skipped = None
+        try:
+            if algorithm in ('DBAC', 'DBAC-compiled'):
+                instance = algorithm_class(
+                    total_nodes=config['N'],
+                    faulty_nodes=config['f'],
+                    message_loss_rate=config['message_loss_rate'],
+                    epsilon=config['epsilon'],
+                    rng=rng,
+                    adversary=config.get('adversary')
+                )
+            else:
+                instance = algorithm_class(
+                    total_nodes=config['N'],
+                    num_faulty_nodes=config['f'],
+                    message_loss_rate=config['message_loss_rate'],
+                    initial_ratio=config['initial_ratio'],
+                    epsilon=config['epsilon'],
+                    rng=rng
+                )
+        except ValueError as error:
+            # Quorums out of reach, the job is recorded as skipped instead of failing the sweep
+            skipped = str(error)
+            rounds = None
+        else:
+            rounds = instance.run()
+
+    result = {
+        'config': config,
+        'rounds': rounds,
+        'num_nodes': config['N'],
+        'message_loss_rate': config['message_loss_rate']
+    }
+    if algorithm in ('Early-DAC', 'Tunable Early-DAC(5)'):
+        result['initial ratio'] = config['initial_ratio']
+    result['seed'] = seed
+    if skipped is not None:
+        result['skipped'] = skipped
+    return result
+
+
+def replay(algorithm, config, seed, run_number=1, quiet=False):
+    """Rerun a single run of a sweep from the configuration and seed stored in its record."""
+    return run_job(algorithm, config, run_number, seed, quiet)
+
+
+def stored_runs(records):
+    """Flatten a results file into (configuration, run record) pairs."""
+    for record in records:
+        if 'runs' in record:
+            # consensus_simulation results are grouped by configuration
+            for run in record['runs']:
+                yield record['configuration'], run
+        else:
+            yield record['config'], record
+
+
+def run_sweep(algorithm, configurations, replicas, output_file=None, max_workers=None, seed=None, quiet=True):
+    """Spread every (configuration, replica) job of a sweep across a process pool.
+
+    DBAC and simulation configurations may name an adversary.STRATEGIES entry
+    under 'adversary' to replace the default Byzantine behaviour. Jobs of a
+    configuration the algorithm rejects, with quorums out of reach, are recorded
+    with rounds None and the error under 'skipped'.
+
+    Every job gets its own seed drawn from the master seed `seed` and stores it
+    in its record, see replay(). Returns the per-run records in
+    configuration order, grouped by configuration with a summary for the vehicle
+    simulation, and writes them to `output_file` when given.
+    """
+    if algorithm == 'simulation':
+        # consensus_simulation needs N > 3f, see run_simulations_and_store_results
+        configurations = [
+            config for config in configurations if config['N'] > 3 * config['f']]
+
+    if seed is None:
+        seed = seeding.master_seed()
+    print(f"Master seed: {seed}")
+    seed_stream = seeding.spawn_seeds(seed)
+    jobs = [(config, run_number) for config in configurations
+            for run_number in range(1, replicas + 1)]
+    seeds = [next(seed_stream) for _ in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        records = list(executor.map(
+            run_job,
+            [algorithm] * len(jobs),
+            [config for config, _ in jobs],
+            [run_number for _, run_number in jobs],
+            seeds,
+            [quiet] * len(jobs),
+            chunksize=max(1, len(jobs) // (4 * (max_workers or os.cpu_count() or 1)))
+        ))
+
+    if algorithm == 'simulation':
+        summarize_runs = load_script('simulation.py').summarize_runs
+        records = [summarize_runs(config, records[i * replicas:(i + 1) * replicas])
+                   for i, config in enumerate(configurations)]
+
+    if output_file is not None:
+        json_file.save_result_to_json(records, output_file)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a configuration sweep of one algorithm on all cores.")
+    parser.add_argument('algorithm', choices=sorted(ALGORITHMS))
+    parser.add_argument('configurations', nargs='?',
+                        help="JSON file with the list of configurations")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="Runs per configuration")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Master seed the per-run seeds are drawn from")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: the file the algorithm script writes)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Keep the per-run output of the algorithms")
+    parser.add_argument('--replay', type=int, default=None, metavar='INDEX',
+                        help="Rerun the run at INDEX of the results file instead of sweeping")
+    args = parser.parse_args()
+    output_file = args.output or ALGORITHMS[args.algorithm][2]
+
+    if args.replay is not None:
+        config, record = list(stored_runs(
+            json_file.load_results_from_json(output_file)))[args.replay]
+        print(replay(args.algorithm, config, record['seed'],
+                     record.get('run_number', 1), quiet=not args.verbose))
+    else:
+        if args.configurations is None:
+            parser.error("a configurations file is required to run a sweep")
+        with open(args.configurations, 'r') as f:
+            configurations = json.load(f)
+
+        run_sweep(
+            args.algorithm, configurations, args.runs, output_file=output_file,
+            max_workers=args.workers, seed=args.seed, quiet=not args.verbose
+        )
@@ -0,0 +1,101 @@
+"""Vehicle positions and range-limited broadcast.
+
+Without a topology every simulator broadcasts all-to-all. A GridTopology places
+the nodes in the plane and only links nodes within radio range of each other.
+Nodes are bucketed in a uniform grid of radio_range sized cells, so the nodes
+in range of a node are in its own cell or one of the 8 cells around it and
+finding them costs O(k) for k nodes nearby instead of O(N).
+
+When the nodes move (see mobility.py), move() only re-buckets the nodes that
+crossed into another cell and only recomputes the neighbours of the nodes in
+the cells around a moved node, and reports which links appeared and
+disappeared. A topology paired with a mobility model starts from its
+positions, see GridTopology.from_mobility.
+"""
+import math
+import random
+from collections import defaultdict
+
+import tracing
+
+
+class GridTopology:
+    def __init__(self, positions, radio_range):
+        self.positions = list(positions)  # (x, y) in metres, indexed by node id
+        self.radio_range = radio_range
+        self.cells = defaultdict(list)  # Grid cell -> ids of the nodes in it
+        for node_id, (x, y) in enumerate(self.positions):
+            self.cells[self.cell_of(x, y)].append(node_id)
+        self._neighbours = {}  # Node id -> neighbour ids, filled on first use
+
+    @classmethod
+    def random(cls, total_nodes, width, height, radio_range, rng=random):
+        """Place total_nodes nodes uniformly at random in a width x height area."""
+        positions = [(rng.uniform(0, width), rng.uniform(0, height))
+                     for _ in range(total_nodes)]
+        return cls(positions, radio_range)
+
+    @classmethod
+    def from_mobility(cls, mobility, radio_range):
+        """Topology of the current positions of a mobility.py model, to move with it."""
+        return cls(mobility.positions, radio_range)
+
+    def cell_of(self, x, y):
+        """Grid cell containing the point (x, y)."""
+        return math.floor(x / self.radio_range), math.floor(y / self.radio_range)
+
+    def neighbours(self, node_id):
+        """Ids of the nodes within radio range of node_id, in increasing order."""
+        neighbours = self._neighbours.get(node_id)
+        if neighbours is None:
+            x, y = self.positions[node_id]
+            cell_x, cell_y = self.cell_of(x, y)
+            range_squared = self.radio_range ** 2
+            neighbours = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other_id in self.cells.get((cell_x + dx, cell_y + dy), ()):
+                        other_x, other_y = self.positions[other_id]
+                        if other_id != node_id and \
+                                (other_x - x) ** 2 + (other_y - y) ** 2 <= range_squared:
+                            neighbours.append(other_id)
+            neighbours.sort()
+            self._neighbours[node_id] = neighbours
+        return neighbours
+
+    def move(self, positions):
+        """Move the nodes to new positions and return the neighbour changes.
+
+        Returns {node_id: (added, removed)} with the ids of the neighbours gained
+        and lost, for the nodes whose neighbours were looked up before and changed.
+        """
+        touched = set()  # Cells around the old and new positions of the moved nodes
+        for node_id, (x, y) in enumerate(positions):
+            if (x, y) == self.positions[node_id]:
+                continue
+            old_cell = self.cell_of(*self.positions[node_id])
+            new_cell = self.cell_of(x, y)
+            if new_cell != old_cell:
+                # Only nodes that crossed a cell boundary are re-bucketed
+                self.cells[old_cell].remove(node_id)
+                if not self.cells[old_cell]:
+                    del self.cells[old_cell]
+                self.cells[new_cell].append(node_id)
+            self.positions[node_id] = (x, y)
+            for cell_x, cell_y in {old_cell, new_cell}:
+                touched.update((cell_x + dx, cell_y + dy)
+                               for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+        # Only nodes within range of a moved node before or after the move, all in
+        # touched cells, can have different neighbours
+        changes = {}
+        for node_id in [node_id for cell in touched for node_id in self.cells.get(cell, ())
+                        if node_id in self._neighbours]:
+            before = self._neighbours.pop(node_id)
+            after = self.neighbours(node_id)
+            if after != before:
+                before, after = set(before), set(after)
+                changes[node_id] = (sorted(after - before), sorted(before - after))
+                if tracing.level <= tracing.INFO:
+                    tracing.emit(tracing.NEIGHBOURS, node_id, *changes[node_id])
+        return changes
@@ -0,0 +1,104 @@
+"""Structured event tracing for the simulators.
+
+Tracing is off by default. Call sites guard every event with a level check so
+that nothing is formatted when it is disabled:
+
+    if tracing.level <= tracing.DEBUG:
+        tracing.emit(tracing.MESSAGE_SENT, sender, recipient, value)
+
+When enabled, every event is written to the sink as one tab-separated line:
+the event type followed by its fields.
+
+    sent        sender, recipient, value[, phase]
+    lost        sender, recipient
+    received    recipient, sender, value[, phase]
+    broadcast   sender, value[, phase]
+    update      node, value[, phase]
+    phase       node, phase, value
+    early_stop  node, value
+    round       round number
+    decision    node, decision
+    crash       node
+    neighbours  node, added ids, removed ids
+
+Set CONSENSUS_TRACE to a file name to enable tracing without code changes, and
+CONSENSUS_TRACE_LEVEL to DEBUG or INFO to pick the level (default DEBUG).
+
+Child processes (sweep workers, the shared-memory and UDP engines) write to
+their own file, the path suffixed with .PID, so lines of different processes
+never interleave. They exit without running atexit handlers, so code running
+in them calls flush() once its events are written.
+"""
+import atexit
+import multiprocessing
+import os
+
+# Levels, lower is more verbose
+DEBUG = 10  # Per-message events
+INFO = 20  # Per-node state changes and rounds
+OFF = 100
+
+# Event types
+MESSAGE_SENT = 'sent'
+MESSAGE_LOST = 'lost'
+MESSAGE_RECEIVED = 'received'
+BROADCAST = 'broadcast'
+STATE_UPDATE = 'update'
+PHASE_ADVANCE = 'phase'
+EARLY_STOP = 'early_stop'
+ROUND = 'round'
+DECISION = 'decision'
+CRASH = 'crash'
+NEIGHBOURS = 'neighbours'
+
+# Events at or above this level are written, OFF disables tracing
+level = OFF
+_sink = None
+_path = None  # Path given to enable(), child processes suffix it with their pid
+
+
+def enable(path, trace_level=DEBUG):
+    """Write events at or above trace_level to the file at path."""
+    global level, _sink, _path
+    disable()
+    _path = path
+    _sink = open(path, 'a', buffering=1 << 16)
+    level = trace_level
+
+
+def disable():
+    """Stop tracing and close the sink."""
+    global level, _sink
+    level = OFF
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+
+
+def flush():
+    """Write the buffered events to the sink file."""
+    if _sink is not None:
+        _sink.flush()
+
+
+def emit(event, *fields):
+    """Write one event record, callers check the level first."""
+    _sink.write(event + '\t' + '\t'.join(map(str, fields)) + '\n')
+
+
+def _reopen_in_child():
+    """Give a forked process its own sink, the buffer of the parent was flushed before the fork."""
+    global _sink
+    if _sink is not None:
+        _sink = open(f'{_path}.{os.getpid()}', 'a', buffering=1 << 16)
+
+
+atexit.register(disable)
+os.register_at_fork(before=flush, after_in_child=_reopen_in_child)
+
+if os.environ.get('CONSENSUS_TRACE'):
+    path = os.environ['CONSENSUS_TRACE']
+    if multiprocessing.parent_process() is not None:
+        # Spawned or forked before tracing was imported
+        path = f'{path}.{os.getpid()}'
+    enable(path, {'DEBUG': DEBUG, 'INFO': INFO}[os.environ.get('CONSENSUS_TRACE_LEVEL', 'DEBUG')])
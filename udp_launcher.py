@@ -0,0 +1,302 @@
+"""Localhost UDP deployment: one OS process per node.
+
+launch() starts a process for every broadcasting node of a DACAlgorithm or
+DBACAlgorithm run. Each process rebuilds the run from its seed (so all
+processes agree on initial values and faulty nodes), drives its own node with
+the per-message reactions of event_simulation.py, beacons its state every
+interval seconds over 127.0.0.1 (one datagram per recipient) or a multicast
+group (one datagram per beacon), and drops every received datagram with the
+message loss rate of the run. A datagram is the sender id, phase and value.
+A multicast datagram reaches every node of the group, so nodes ignore the ones
+of nodes they do not hear.
+
+The launcher stops the nodes once every correct node decided or after the
+timeout, and reports the wall-clock time to termination, datagram and byte
+counts, and the datagrams the host itself lost (full socket buffers under
+load, counted from the difference between sent and received datagrams, so
+it includes the few datagrams still in flight when the nodes stop).
+"""
+import json
+import multiprocessing
+import queue
+import socket
+import struct
+import time
+
+import seeding
+import tracing
+from Consensus_with_DAC_algorithm import DACAlgorithm
+from DBACAlgorithm import DBACAlgorithm
+from event_simulation import REACTIONS
+
+MESSAGE = struct.Struct('!IId')  # Sender id, phase, value
+# IPv4 and UDP headers of every datagram
+HEADER_BYTES = 28
+MULTICAST_GROUP = '239.255.42.99'
+TRANSPORTS = ('unicast', 'multicast')
+# Per-node counters reported to the launcher
+COUNTERS = ('sent', 'payload_bytes', 'received',
+            'dropped', 'send_errors', 'beacons_skipped')
+# Seconds the launcher waits for the node processes to exit before terminating them
+JOIN_TIMEOUT = 5.0
+
+
+def build_algorithm(algorithm, config, seed):
+    """The DACAlgorithm or DBACAlgorithm of a run, the same in every process for the same seed."""
+    rng = seeding.make_rng(seed)
+    if algorithm == 'DBAC':
+        return DBACAlgorithm(config['N'], config['f'], config['message_loss_rate'], config['epsilon'], rng=rng)
+    if algorithm == 'DAC':
+        return DACAlgorithm(config['N'], config['f'], config['message_loss_rate'], config['initial_ratio'],
+                            config['epsilon'], rng=rng)
+    raise ValueError(
+        f"Unknown algorithm {algorithm!r}, expected 'DAC' or 'DBAC'")
+
+
+def reactions_of(algorithm):
+    return next(reactions for cls, reactions in REACTIONS.items() if isinstance(algorithm, cls))(algorithm)
+
+
+def open_socket(transport, multicast_port):
+    """Socket of a node: an ephemeral 127.0.0.1 port, or the multicast group port with loopback."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if transport == 'unicast':
+        sock.bind(('127.0.0.1', 0))
+        return sock
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('', multicast_port))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, struct.pack(
+        '4s4s', socket.inet_aton(MULTICAST_GROUP), socket.inet_aton('127.0.0.1')))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                    socket.inet_aton('127.0.0.1'))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    return sock
+
+
+def run_node(node_id, algorithm_name, config, seed, loss_seed, transport, multicast_port, interval,
+             ready, peers, start, stop, results):
+    """Process of one node: beacon, receive with injected loss, report its decision and counters."""
+    algorithm = build_algorithm(algorithm_name, config, seed)
+    reactions = reactions_of(algorithm)
+    rng = seeding.make_rng(loss_seed)
+    loss_rate = algorithm.message_loss_rate
+    recipients = reactions.recipients(node_id)
+    # Nodes heard, a multicast datagram reaches every node of the group whatever the topology
+    senders = set(recipients)
+    deciding = node_id in set(reactions.correct())
+
+    sock = open_socket(transport, multicast_port)
+    ready.put((node_id, sock.getsockname()[1]))
+    ports = peers.recv()  # Node id -> port, for unicast
+    counters = dict.fromkeys(COUNTERS, 0)
+
+    def send(datagram, address):
+        try:
+            sock.sendto(datagram, address)
+        except OSError:
+            counters['send_errors'] += 1
+            return
+        counters['sent'] += 1
+        counters['payload_bytes'] += len(datagram)
+
+    start.wait()
+    next_beacon = time.monotonic() + rng.uniform(0, interval)
+    decided = False
+    while True:
+        now = time.monotonic()
+        if now >= next_beacon:
+            if stop.is_set():
+                break
+            sender_id, value, phase = reactions.message(node_id)
+            if transport == 'multicast':
+                # One datagram for everyone, a Byzantine sender cannot tailor it per recipient
+                if hasattr(value, 'value_for'):
+                    value = value.value_for(algorithm.nodes[node_id])
+                if value is not None:
+                    send(MESSAGE.pack(sender_id, phase, value),
+                         (MULTICAST_GROUP, multicast_port))
+            elif hasattr(value, 'value_for'):
+                for recipient in recipients:
+                    tailored = value.value_for(algorithm.nodes[recipient])
+                    if tailored is not None:
+                        send(MESSAGE.pack(sender_id, phase, tailored),
+                             ('127.0.0.1', ports[recipient]))
+            else:
+                datagram = MESSAGE.pack(sender_id, phase, value)
+                for recipient in recipients:
+                    send(datagram, ('127.0.0.1', ports[recipient]))
+            next_beacon += interval
+            now = time.monotonic()
+            if next_beacon <= now:
+                # Overloaded host, skip the beacons there was no time for
+                skipped = int((now - next_beacon) // interval) + 1
+                counters['beacons_skipped'] += skipped
+                next_beacon += skipped * interval
+            continue
+
+        sock.settimeout(next_beacon - now)
+        try:
+            datagram = sock.recv(64)
+        except socket.timeout:
+            continue
+        sender_id, phase, value = MESSAGE.unpack(datagram)
+        if sender_id == node_id:
+            continue  # Own multicast datagram
+        counters['received'] += 1
+        if sender_id not in senders:
+            continue  # Multicast datagram of a node out of range
+        if rng.random() < loss_rate:
+            counters['dropped'] += 1
+            continue
+        # Phase of the sender as last heard, the Byzantine strategies target recipients by phase
+        algorithm.nodes[sender_id].phase = max(
+            algorithm.nodes[sender_id].phase, phase)
+        if reactions.receive(node_id, (sender_id, value, phase)) and deciding and not decided:
+            decided = True
+            results.put(('decision', node_id, time.monotonic()))
+
+    sock.close()
+    tracing.flush()  # The process exits without atexit handlers
+    results.put(('counters', node_id, counters))
+
+
+def launch(algorithm, config, seed, transport='unicast', interval=0.01, timeout=60.0):
+    """Run every node of one configuration as a process over localhost UDP and return the report."""
+    if transport not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown transport {transport!r}, expected one of {TRANSPORTS}")
+    reactions = reactions_of(build_algorithm(algorithm, config, seed))
+    node_ids = reactions.broadcasting()
+    correct = reactions.correct()
+
+    multicast_port = 0
+    if transport == 'multicast':
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.bind(('', 0))
+            multicast_port = probe.getsockname()[1]
+
+    context = multiprocessing.get_context()
+    ready, results = context.Queue(), context.Queue()
+    start, stop = context.Event(), context.Event()
+    loss_seeds = seeding.spawn_seeds(seed)
+    connections, processes = [], []
+    for node_id in node_ids:
+        parent, child = context.Pipe()
+        connections.append(parent)
+        processes.append(context.Process(target=run_node, args=(
+            node_id, algorithm, config, seed, next(loss_seeds), transport, multicast_port, interval,
+            ready, child, start, stop, results)))
+    for process in processes:
+        process.start()
+
+    try:
+        ports = {}
+        while len(ports) < len(node_ids):
+            try:
+                node_id, port = ready.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError(
+                    f"{len(node_ids) - len(ports)} node processes did not report their port "
+                    f"within {timeout} s") from None
+            ports[node_id] = port
+        for connection in connections:
+            connection.send(ports)
+
+        started = time.monotonic()
+        start.set()
+        decisions, counters = {}, {}
+        while len(decisions) < len(correct):
+            remaining = started + timeout - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                kind, node_id, value = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            decisions[node_id] = value
+        stop.set()
+        stopped = time.monotonic()
+
+        while len(counters) < len(node_ids):
+            kind, node_id, value = results.get(timeout=timeout)
+            if kind == 'decision':
+                decisions[node_id] = value
+            else:
+                counters[node_id] = value
+    finally:
+        stop.set()
+        # After a failure, nodes waiting for the start stop at their first beacon
+        start.set()
+        for connection in connections:
+            connection.close()
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in processes:
+            if process.is_alive():
+                # Still waiting for the ports of a failed start, or stuck
+                process.terminate()
+                process.join()
+
+    total = {key: sum(node[key] for node in counters.values())
+             for key in COUNTERS}
+    # Every unicast datagram has one recipient, a multicast datagram reaches every other node
+    expected = total['sent'] * \
+        (len(node_ids) - 1 if transport == 'multicast' else 1)
+    wall_time = stopped - started
+    terminated = len(decisions) == len(correct)
+    return {
+        'algorithm': algorithm,
+        'transport': transport,
+        'processes': len(node_ids),
+        'decided': len(decisions),
+        'time_to_termination': max(decisions.values()) - started if terminated and decisions else None,
+        'wall_time': wall_time,
+        'datagrams_sent': total['sent'],
+        'datagrams_received': total['received'],
+        'datagrams_dropped': total['dropped'],  # Injected loss
+        'datagrams_lost_by_host': max(0, expected - total['received']),
+        'send_errors': total['send_errors'],
+        'beacons_skipped': total['beacons_skipped'],  # Beacon periods a node had no time for
+        'payload_bytes_sent': total['payload_bytes'],
+        'wire_bytes_sent': total['payload_bytes'] + HEADER_BYTES * total['sent'],
+        'datagrams_per_second': total['received'] / wall_time,
+        'wire_bytes_per_second': (total['payload_bytes'] + HEADER_BYTES * total['sent']) / wall_time
+    }
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+
+    configurations = [
+        {'algorithm': 'DAC', 'transport': 'unicast', 'N': 20, 'f': 6, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+        {'algorithm': 'DAC', 'transport': 'multicast', 'N': 20, 'f': 6, 'message_loss_rate': 0.1,
+            'initial_ratio': 0.8, 'epsilon': 0.01},
+        {'algorithm': 'DBAC', 'transport': 'unicast', 'N': 20, 'f': 3, 'message_loss_rate': 0.1,
+            'epsilon': 0.01},
+    ]
+
+    # Every run draws from its own generator, the seed is stored with the run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []
+
+    for config in configurations:
+        for _ in range(num_runs):
+            seed = next(seeds)
+            print(f"\nLaunching {config['N']} UDP nodes with configuration: {config}")
+            report = launch(config['algorithm'], config,
+                            seed, transport=config['transport'])
+            print(f"Terminated after {report['time_to_termination']} s, "
+                  f"{report['datagrams_per_second']:.0f} datagrams/s, "
+                  f"{report['datagrams_lost_by_host']} datagrams lost by the host")
+            results.append({'config': config, 'seed': seed, **report})
+
+    # Write results to JSON file
+    with open('udp_results.json', 'w') as f:
+        json.dump(results, f, indent=4)
@@ -0,0 +1,199 @@
+import json
+import numpy as np
+
+import seeding
+
+# Order in which a node folds in the values it received: 'sender' is the order
+# of ACAlgorithm.run (increasing sender id), 'random' draws a fresh arrival
+# order for every node in every round
+ARRIVAL_ORDERS = ('sender', 'random')
+
+
+class BatchedACAlgorithm:
+    """Array-based engine running independent replicas of the AC algorithm together.
+
+    Node.update_value in AC.py halves towards every received value in turn, so
+    after k values the value of a node is
+
+        value / 2^k + sum over the received values v_r of v_r / 2^(k - r + 1)
+
+    with r the arrival rank (1 for the first value). The engine builds the
+    delivery mask of a round as an array, turns the arrival ranks into these
+    weights and updates all nodes of all replicas with one matrix-vector product.
+    Crashed nodes neither send nor receive, like in ACAlgorithm.
+    """
+
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, epsilon, initial_ratio,
+                 replicas=1, arrival='sender', rng=None):
+        if arrival not in ARRIVAL_ORDERS:
+            raise ValueError(
+                f"Unknown arrival order {arrival!r}, expected one of {ARRIVAL_ORDERS}")
+        self.total_nodes = total_nodes
+        self.num_faulty_nodes = num_faulty_nodes
+        self.message_loss_rate = message_loss_rate
+        self.epsilon = epsilon
+        self.arrival = arrival
+        self.rng = np.random.default_rng() if rng is None else rng
+        # Replicas still running, as indices into the result vector
+        self.live = np.arange(replicas)
+        self.initialize_nodes(initial_ratio, replicas)
+        self.initialize_crash_nodes()
+
+    def initialize_nodes(self, initial_ratio, replicas):
+        """Initialize nodes with values in a specified ratio."""
+        num_ones = int(self.total_nodes * initial_ratio)
+        values = np.zeros((replicas, self.total_nodes))
+        values[:, :num_ones] = 1
+        # Shuffle to distribute 1s and 0s randomly
+        self.value = self.rng.permuted(values, axis=-1)
+
+    def initialize_crash_nodes(self):
+        """Randomly crash `f` nodes of every replica."""
+        ranks = self.rng.random(self.value.shape).argsort(axis=-1)
+        self.crashed = ranks < self.num_faulty_nodes
+
+    def broadcast_messages(self):
+        """Return the delivery mask of one round: entry [b, i, j] is True when node i receives the value of node j."""
+        n = self.total_nodes
+        delivered = self.rng.random(
+            (len(self.live), n, n)) > self.message_loss_rate
+        # Crashed nodes neither broadcast nor receive
+        alive = ~self.crashed
+        delivered &= alive[:, :, np.newaxis] & alive[:, np.newaxis, :]
+        delivered[:, np.arange(n), np.arange(n)] = False
+        return delivered
+
+    def process_messages(self, delivered):
+        """Fold the received values into every node, as Node.update_value does one at a time."""
+        if self.arrival == 'sender':
+            arrived = delivered
+        else:
+            order = self.rng.random(delivered.shape).argsort(axis=-1)
+            arrived = np.take_along_axis(delivered, order, axis=-1)
+
+        # Values that arrive after each one, counting from the end of the arrival order
+        counts = arrived.astype(np.int64)
+        later = np.flip(np.flip(counts, axis=-1).cumsum(axis=-1), axis=-1) - counts
+        if self.arrival == 'random':
+            unsorted = np.empty_like(later)
+            np.put_along_axis(unsorted, order, later, axis=-1)
+            later = unsorted
+
+        weights = np.where(delivered, np.ldexp(1.0, -(later + 1)), 0.0)
+        own_weight = np.ldexp(1.0, -delivered.sum(axis=-1))
+        self.value = own_weight * self.value + \
+            np.matmul(weights, self.value[..., np.newaxis])[..., 0]
+
+    def keep(self, mask):
+        """Drop the replicas not selected by mask from the state arrays."""
+        self.live = self.live[mask]
+        if isinstance(self.rng, seeding.ReplicaGenerators):
+            self.rng.keep(mask)
+        self.crashed = self.crashed[mask]
+        self.value = self.value[mask]
+
+    def run(self):
+        """Run all replicas until their values converge within epsilon and return the rounds of each one."""
+        results = np.zeros(len(self.live), dtype=np.int64)
+        rounds = 0
+
+        while True:
+            rounds += 1
+            self.process_messages(self.broadcast_messages())
+
+            # Check convergence among non-crashed nodes
+            values_max = np.where(self.crashed, -np.inf, self.value).max(axis=-1)
+            values_min = np.where(self.crashed, np.inf, self.value).min(axis=-1)
+            converged = values_max - values_min < self.epsilon
+            if converged.any():
+                results[self.live[converged]] = rounds
+                if converged.all():
+                    break
+                self.keep(~converged)
+        return results
+
+
+class VectorizedACAlgorithm(BatchedACAlgorithm):
+    """Single run of the array-based engine, used like ACAlgorithm."""
+
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, epsilon, initial_ratio,
+                 arrival='sender', rng=None):
+        super().__init__(total_nodes, num_faulty_nodes, message_loss_rate, epsilon, initial_ratio,
+                         replicas=1, arrival=arrival, rng=rng)
+
+    def run(self):
+        """Run the consensus algorithm until values converge within epsilon."""
+        rounds = int(super().run()[0])
+        print(f"\nConverged in {rounds} rounds.")
+        return rounds
+
+    def print_final_values(self):
+        """Print the final values of each node (indicating crashed nodes)."""
+        for i in range(self.total_nodes):
+            if not self.crashed[0, i]:
+                print(f"Node {i}: Final Value = {self.value[0, i]}")
+            else:
+                print(f"Node {i}: Crashed")
+
+
+def run_batched(config, replicas, arrival='sender', rng=None):
+    """Run `replicas` independent runs of one configuration and return their rounds to convergence."""
+    engine = BatchedACAlgorithm(
+        total_nodes=config['N'],
+        num_faulty_nodes=config['f'],
+        message_loss_rate=config['message_loss_rate'],
+        epsilon=config['epsilon'],
+        initial_ratio=config['initial_ratio'],
+        replicas=replicas,
+        arrival=arrival,
+        rng=rng
+    )
+    return engine.run()
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+
+    configurations = [
+        # works for => n ≥ 2f + 1.
+        {'N': 50, 'f': 23, 'message_loss_rate': 0.05,
+            'epsilon': 0.01, 'initial_ratio': 0.8},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.1,
+            'epsilon': 0.01, 'initial_ratio': 0.8},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.15,
+            'epsilon': 0.01, 'initial_ratio': 0.8},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.2,
+            'epsilon': 0.01,  'initial_ratio': 0.8},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.25,
+            'epsilon': 0.01, 'initial_ratio': 0.8},
+        {'N': 250, 'f': 80, 'message_loss_rate': 0.25,
+            'epsilon': 0.01, 'initial_ratio': 0.8},
+    ]
+
+    # Every replica draws from its own generator, its seed is stored with its run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []
+
+    for config in configurations:
+        replica_seeds = [next(seeds) for _ in range(num_runs)]
+        print(f"\nRunning {num_runs} batched AC runs with configuration: {config}")
+        batch = run_batched(config, num_runs, rng=seeding.ReplicaGenerators(replica_seeds))
+        for seed, rounds in zip(replica_seeds, batch):
+            # Same record layout as AC.py
+            result = {
+                'config': config,
+                'rounds': int(rounds),
+                'num_nodes': config['N'],
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
+            }
+            results.append(result)
+
+    # Write results to JSON file
+    with open('AC_Algorithm_Results.json', 'w') as f:
+        json.dump(results, f, indent=4)
+    print("Results saved to AC_Algorithm_Results.json")
@@ -0,0 +1,319 @@
+import json
+import numpy as np
+
+import seeding
+from Consensus_with_DAC_algorithm import MAX_ROUNDS, calculate_pend
+
+# Phase-advance rule of each algorithm: None is the DAC majority rule, a number is
+# the Early-DAC rule with that many warm-up rounds (Early-DAC.py uses 0,
+# Tunable_Early-Dac(5).py uses 5)
+VARIANTS = {
+    'DAC': None,
+    'Early-DAC': 0,
+    'Tunable Early-DAC(5)': 5,
+}
+
+# Output file of each algorithm, next to but apart from the files of the algorithm
+# scripts, whose configurations differ
+RESULT_FILES = {
+    'DAC': 'Batched_DAC_Algorithm_Results.json',
+    'Early-DAC': 'Batched_Early-DAC_AlgoResults.json',
+    'Tunable Early-DAC(5)': 'Batched_Tunable_Early-DAC(5)_AlgoResults.json',
+}
+
+
+class BatchedDACAlgorithm:
+    """Array-based engine running independent replicas of the DAC family together.
+
+    Holds value, phase, min_value, max_value and the received bit vectors R of
+    every node of every replica as NumPy arrays (replicas x nodes, and
+    replicas x nodes x nodes for R) and advances a whole round (message loss,
+    phase jumps, min/max folding, quorum check) with array operations. The
+    per-node rules are the ones of DACAlgorithm in Consensus_with_DAC_algorithm.py,
+    Early-DAC.py and Tunable_Early-Dac(5).py, so the distribution of rounds to
+    termination is the same.
+    """
+
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon,
+                 replicas=1, variant='DAC', rng=None):
+        self.total_nodes = total_nodes
+        self.num_faulty_nodes = num_faulty_nodes
+        self.message_loss_rate = message_loss_rate
+        self.epsilon = epsilon
+        self.pend = calculate_pend(epsilon)
+        self.warmup_rounds = VARIANTS[variant]
+        self.rng = np.random.default_rng() if rng is None else rng
+        # Replicas still running, as indices into the result vector
+        self.live = np.arange(replicas)
+
+        ranks = self.rng.random((replicas, total_nodes)).argsort(axis=-1)
+        self.faulty = ranks < num_faulty_nodes
+        self.initialize_nodes(initial_ratio, replicas)
+
+    def initialize_nodes(self, ratio, replicas):
+        """Initialize the nodes with binary values based on the input ratio."""
+        num_ones = int(self.total_nodes * ratio)
+        values = np.zeros((replicas, self.total_nodes))
+        values[:, :num_ones] = 1  # The rest will have value 0
+
+        self.value = self.rng.permuted(values, axis=-1)
+        self.phase = np.zeros((replicas, self.total_nodes), dtype=np.int64)
+        self.min_value = self.value.copy()
+        self.max_value = self.value.copy()
+        # R[b, i, j] is set when node i of replica b holds a message from node j in its current phase
+        self.R = np.broadcast_to(
+            np.eye(self.total_nodes, dtype=bool), (replicas, self.total_nodes, self.total_nodes)).copy()
+        if self.warmup_rounds is not None:
+            # Values received in the current phase, Early-DAC starts with an all-zero set
+            self.set = np.zeros((replicas, self.total_nodes, self.total_nodes))
+
+    def broadcast_messages(self):
+        """Return the delivery mask of one round: entry [b, i, j] is True when node i receives the message of node j."""
+        n = self.total_nodes
+        delivered = self.rng.random(
+            (len(self.live), n, n)) > self.message_loss_rate
+        delivered &= ~self.faulty[:, np.newaxis, :]  # Crashed nodes do not broadcast
+        delivered[:, np.arange(n), np.arange(n)] = False
+        return delivered
+
+    def process_messages(self, delivered, rounds):
+        """Apply one round of received messages to every node."""
+        n = self.total_nodes
+        nodes = np.arange(n)
+        identity = np.eye(n, dtype=bool)
+
+        # Every message carries the state of its sender at broadcast time
+        sent_value = self.value[:, np.newaxis, :]
+        sent_phase = self.phase[:, np.newaxis, :]
+
+        # Crashed nodes and nodes that reached pend do not update their state
+        active = ~self.faulty & (self.phase < self.pend)
+
+        # A node ends up in the highest phase it heard of
+        heard_phase = np.where(delivered, sent_phase, -1).max(axis=-1)
+        jumped = active & (heard_phase > self.phase)
+        new_phase = np.where(jumped, heard_phase, self.phase)
+        same_phase = delivered & (sent_phase == new_phase[..., np.newaxis])
+
+        # A node looks at senders already in R first and at the others next, each
+        # group in sender order. The first message of the highest phase triggers
+        # the last jump, only the messages after it count for the new phase.
+        order = np.where(self.R, 0, n) + nodes
+        order = np.where(same_phase, order, 2 * n)
+        first = order.argmin(axis=-1)
+        after_first = order > np.take_along_axis(
+            order, first[..., np.newaxis], axis=-1)
+        fresh = np.where(jumped[..., np.newaxis],
+                         same_phase & after_first, same_phase & ~self.R)
+        fresh &= active[..., np.newaxis]
+
+        # Jumping nodes adopt the value that moved them and reset for the new phase
+        self.value = np.where(jumped, np.take_along_axis(
+            self.value, first, axis=-1), self.value)
+        self.phase = new_phase
+        self.min_value = np.where(jumped, self.value, self.min_value)
+        self.max_value = np.where(jumped, self.value, self.max_value)
+        self.R = np.where(jumped[..., np.newaxis], identity, self.R) | fresh
+
+        self.min_value = np.minimum(self.min_value, np.where(
+            fresh, sent_value, np.inf).min(axis=-1))
+        self.max_value = np.maximum(self.max_value, np.where(
+            fresh, sent_value, -np.inf).max(axis=-1))
+
+        if self.warmup_rounds is None:
+            # Nodes holding a majority of the messages of their phase advance
+            advance = active & (self.phase < self.pend) & (
+                self.R.sum(axis=-1) >= (n // 2) + 1)
+            self.value = np.where(
+                advance, (self.min_value + self.max_value) / 2, self.value)
+            self.phase = self.phase + advance
+        else:
+            advance = self.early_stopping(
+                active, jumped, fresh, sent_value, rounds)
+
+        self.min_value = np.where(advance, self.value, self.min_value)
+        self.max_value = np.where(advance, self.value, self.max_value)
+        self.R = np.where(advance[..., np.newaxis], identity, self.R)
+        if self.warmup_rounds is not None:
+            self.reset_set(advance)
+
+    def reset_set(self, mask):
+        """Clear the received values of the masked nodes, keeping only their own value."""
+        diagonal = np.arange(self.total_nodes)
+        self.set = np.where(mask[..., np.newaxis], 0.0, self.set)
+        self.set[..., diagonal, diagonal] = np.where(
+            mask, self.value, self.set[..., diagonal, diagonal])
+
+    def early_stopping(self, active, jumped, fresh, sent_value, rounds):
+        """Early-DAC phase advance, returns the mask of nodes that advanced."""
+        n = self.total_nodes
+        f = self.num_faulty_nodes
+
+        # Track the values received in the current phase
+        self.reset_set(jumped)
+        self.set = np.where(fresh, sent_value, self.set)
+
+        if rounds <= self.warmup_rounds:
+            self.value = np.where(active, self.min_value, self.value)
+            return np.zeros_like(active)
+
+        advance = active & (self.phase < self.pend) & (
+            self.R.sum(axis=-1) >= n - f)
+
+        # Order statistics of the received values, entries outside R sort last
+        received = np.where(self.R, self.set, np.inf)
+        upper = min(n - 2 * f + 1, n - 1)
+        ranked = np.partition(received, sorted({0, f, upper}), axis=-1)
+        min_received = ranked[..., 0]
+        max_received = np.where(self.R, self.set, -np.inf).max(axis=-1)
+        low_pick = ranked[..., f]
+        high_pick = ranked[..., upper] if n - 2 * f + 1 < n else np.inf
+
+        half_epsilon = self.epsilon / 2
+        stop = max_received - min_received < half_epsilon
+        take_low = ~stop & (max_received - low_pick < half_epsilon)
+        take_high = ~stop & ~take_low & (high_pick < half_epsilon)
+        midpoint = (self.min_value + self.max_value) / 2
+        new_value = np.select([stop, take_low, take_high], [
+                              min_received, low_pick, high_pick], midpoint)
+
+        self.value = np.where(advance, new_value, self.value)
+        self.phase = np.where(advance & stop, self.pend,
+                              self.phase + (advance & ~stop))
+        return advance
+
+    def keep(self, mask):
+        """Drop the replicas not selected by mask from the state arrays."""
+        self.live = self.live[mask]
+        if isinstance(self.rng, seeding.ReplicaGenerators):
+            self.rng.keep(mask)
+        self.faulty = self.faulty[mask]
+        self.value = self.value[mask]
+        self.phase = self.phase[mask]
+        self.min_value = self.min_value[mask]
+        self.max_value = self.max_value[mask]
+        self.R = self.R[mask]
+        if self.warmup_rounds is not None:
+            self.set = self.set[mask]
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """Run all replicas and return the list of rounds to termination, None for the replicas past max_rounds."""
+        results = [None] * len(self.live)
+        rounds = 0
+
+        while True:
+            rounds += 1
+            # Check which replicas have all non-faulty nodes in the termination phase
+            terminated = np.all(
+                (self.phase == self.pend) | self.faulty, axis=-1)
+            if terminated.any():
+                for replica in self.live[terminated]:
+                    results[replica] = rounds
+                if terminated.all():
+                    break
+                self.keep(~terminated)
+            if rounds > max_rounds:
+                print(f"{len(self.live)} of {len(results)} replicas did not reach termination within {max_rounds} rounds.")
+                break
+
+            self.process_messages(self.broadcast_messages(), rounds)
+        return results
+
+
+class VectorizedDACAlgorithm(BatchedDACAlgorithm):
+    """Single run of the array-based engine, used like DACAlgorithm."""
+
+    def __init__(self, total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon,
+                 variant='DAC', rng=None):
+        super().__init__(total_nodes, num_faulty_nodes, message_loss_rate, initial_ratio, epsilon,
+                         replicas=1, variant=variant, rng=rng)
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """Run the DAC algorithm and count the number of rounds to termination, None past max_rounds."""
+        rounds = super().run(max_rounds)[0]
+        if rounds is not None:
+            print(f"All nodes reached termination after {rounds} rounds.")
+        return rounds
+
+    def print_final_values(self, epsilon=0.01):
+        """Print the final state of all nodes."""
+        print("\n--- Final Node States ---")
+        for i in range(self.total_nodes):
+            if self.faulty[0, i]:
+                print(f"Node {i} is crashed and has no final output.")
+                continue
+            value = self.value[0, i]
+            if value < 0.25 - epsilon:
+                decision = 0
+            elif value > 0.25 + epsilon:
+                decision = 1
+            else:
+                decision = None
+            print(
+                f"Node {i}: Final Value = {value}, Final Phase = {self.phase[0, i]}, Decision = {decision}")
+
+
+def run_batched(config, replicas, variant='DAC', rng=None, max_rounds=MAX_ROUNDS):
+    """Run `replicas` independent runs of one configuration and return their rounds to termination, None past max_rounds."""
+    engine = BatchedDACAlgorithm(
+        total_nodes=config['N'],
+        num_faulty_nodes=config['f'],
+        message_loss_rate=config['message_loss_rate'],
+        initial_ratio=config['initial_ratio'],
+        epsilon=config['epsilon'],
+        replicas=replicas,
+        variant=variant,
+        rng=rng
+    )
+    return engine.run(max_rounds)
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+
+    configurations = [
+        {'N': 15, 'f': 4, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+        {'N': 30, 'f': 9, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+        {'N': 50, 'f': 15, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+        {'N': 75, 'f': 24, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+        {'N': 125, 'f': 40, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+        {'N': 250, 'f': 80, 'message_loss_rate': 0.8,
+         'initial_ratio': 0.8, 'epsilon': 0.001},
+    ]
+
+    # Every replica draws from its own generator, its seed is stored with its run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    for variant, output_file in RESULT_FILES.items():
+        results = []  # This will store results for the JSON file
+
+        for config in configurations:
+            replica_seeds = [next(seeds) for _ in range(num_runs)]
+            print(
+                f"\nRunning {num_runs} batched {variant} runs with configuration: {config}")
+            batch = run_batched(config, num_runs, variant=variant,
+                                rng=seeding.ReplicaGenerators(replica_seeds))
+            for seed, rounds in zip(replica_seeds, batch):
+                # Same record layout as the algorithm scripts
+                result = {
+                    'config': config,
+                    'rounds': rounds,
+                    'num_nodes': config['N'],
+                    'message_loss_rate': config['message_loss_rate']
+                }
+                if variant != 'DAC':
+                    result['initial ratio'] = config['initial_ratio']
+                result['seed'] = seed
+                results.append(result)
+
+        # Write results to JSON file
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,193 @@
+import json
+import numpy as np
+
+import adversary
+from adversary import OMITTING as omitting_strategies
+import seeding
+from DBACAlgorithm import calculate_p_end
+
+
+class BatchedDBACAlgorithm:
+    """Array-based engine running independent replicas of DBAC together.
+
+    Every round is an N x N payload matrix, entry [b, i, j] is the value node j
+    of replica b sends to node i: the value of j for correct nodes, a value of
+    the adversary strategy for Byzantine nodes (the first f nodes, as in
+    DBACAlgorithm, by default with the strategies of DBACAlgorithm.Node).
+    Acceptance, the f + 1 smallest and largest received values and the
+    (n + 3f) // 2 + 1 quorum are array operations over all nodes of all replicas. The per-node rules are the ones of DBACAlgorithm.py, so the
+    distribution of rounds to termination is the same.
+    """
+
+    def __init__(self, total_nodes, faulty_nodes, message_loss_rate, epsilon, replicas=1, rng=None,
+                 adversary='dbac-mix'):
+        self.total_nodes = total_nodes
+        self.faulty_nodes = faulty_nodes
+        self.adversary = adversary  # adversary.STRATEGIES name of the Byzantine nodes
+        self.message_loss_rate = message_loss_rate
+        self.p_end = calculate_p_end(total_nodes, epsilon)
+        self.quorum = (total_nodes + 3 * faulty_nodes) // 2 + 1
+        if adversary in omitting_strategies and total_nodes - faulty_nodes < self.quorum:
+            raise ValueError(
+                f"The {total_nodes - faulty_nodes} correct nodes cannot fill the quorum of {self.quorum} "
+                f"with the Byzantine nodes omitting their messages")
+        self.rng = np.random.default_rng() if rng is None else rng
+        # Replicas still running, as indices into the result vector
+        self.live = np.arange(replicas)
+        self.initialize_nodes(replicas)
+
+    def initialize_nodes(self, replicas):
+        """Start every node in phase 0 with a uniform random value."""
+        n = self.total_nodes
+        self.vi = self.rng.random((replicas, n))
+        self.phase = np.zeros((replicas, n), dtype=np.int64)
+        # Ri[b, i, j] is set when node i of replica b accepted a value of node j in its current phase
+        self.Ri = np.broadcast_to(
+            np.eye(n, dtype=bool), (replicas, n, n)).copy()
+        # Value accepted from each sender, valid where Ri is set off the diagonal
+        self.stored = np.zeros((replicas, n, n))
+
+    def broadcast_messages(self):
+        """Return the delivery mask and the payload matrix of one round, both indexed [b, recipient, sender]."""
+        n = self.total_nodes
+        f = self.faulty_nodes
+        replicas = len(self.live)
+
+        delivered = self.rng.random(
+            (replicas, n, n)) >= self.message_loss_rate
+        delivered[:, np.arange(n), np.arange(n)] = False
+
+        # Correct nodes send their value to everyone, Byzantine nodes what the adversary picks
+        payload = np.repeat(self.vi[:, np.newaxis, :], n, axis=1)
+        payload[:, :, :f] = adversary.payload(
+            self.adversary, self.rng, self.phase, self.vi, self.phase[:, :f])
+        # Omitted messages are never delivered
+        delivered &= ~np.isnan(payload)
+        return delivered, payload
+
+    def process_messages(self, delivered, payload):
+        """Accept the delivered messages and advance the nodes that reached the quorum."""
+        n = self.total_nodes
+        f = self.faulty_nodes
+
+        # A node below p_end accepts the first message of each sender in a phase at least its own
+        active = self.phase < self.p_end
+        accepted = delivered & ~self.Ri & active[:, :, np.newaxis] & (
+            self.phase[:, np.newaxis, :] >= self.phase[:, :, np.newaxis])
+        self.Ri |= accepted
+        self.stored = np.where(accepted, payload, self.stored)
+
+        advance = active & (self.Ri.sum(axis=-1) >= self.quorum)
+        if not advance.any():
+            return
+
+        # New value is the midpoint of the (f + 1)-th smallest and (f + 1)-th largest received values
+        received = self.Ri[advance] & ~np.eye(n, dtype=bool)[advance.nonzero()[1]]
+        values = self.stored[advance]
+        low = np.partition(np.where(received, values, np.inf), f, axis=-1)[:, f]
+        high = -np.partition(np.where(received, -values, np.inf), f, axis=-1)[:, f]
+        self.vi[advance] = (low + high) / 2
+        self.phase += advance
+        self.Ri[advance] = np.eye(n, dtype=bool)[advance.nonzero()[1]]
+
+    def keep(self, mask):
+        """Drop the replicas not selected by mask from the state arrays."""
+        self.live = self.live[mask]
+        if isinstance(self.rng, seeding.ReplicaGenerators):
+            self.rng.keep(mask)
+        self.vi = self.vi[mask]
+        self.phase = self.phase[mask]
+        self.Ri = self.Ri[mask]
+        self.stored = self.stored[mask]
+
+    def run(self):
+        """Run all replicas until all their nodes reach p_end and return the rounds of each one."""
+        results = np.zeros(len(self.live), dtype=np.int64)
+        rounds = 0
+
+        while True:
+            rounds += 1
+            self.process_messages(*self.broadcast_messages())
+
+            terminated = np.all(self.phase == self.p_end, axis=-1)
+            if terminated.any():
+                results[self.live[terminated]] = rounds
+                if terminated.all():
+                    break
+                self.keep(~terminated)
+        return results
+
+
+class VectorizedDBACAlgorithm(BatchedDBACAlgorithm):
+    """Single run of the array-based engine, used like DBACAlgorithm."""
+
+    def __init__(self, total_nodes, faulty_nodes, message_loss_rate, epsilon, rng=None,
+                 adversary='dbac-mix'):
+        super().__init__(total_nodes, faulty_nodes, message_loss_rate, epsilon,
+                         replicas=1, rng=rng, adversary=adversary)
+
+    def run(self):
+        """Runs the DBAC algorithm until all nodes reach p_end."""
+        return int(super().run()[0])
+
+    def print_final_values(self):
+        """Prints final values of each node after consensus is reached."""
+        print(f"\n--- Final Results ---")
+        for i in range(self.total_nodes):
+            print(
+                f"Node {i}: final value = {self.vi[0, i]:.4f}, final phase = {self.phase[0, i]}")
+
+
+def run_batched(config, replicas, rng=None, adversary='dbac-mix'):
+    """Run `replicas` independent runs of one configuration and return their rounds to termination."""
+    engine = BatchedDBACAlgorithm(
+        total_nodes=config['N'],
+        faulty_nodes=config['f'],
+        message_loss_rate=config['message_loss_rate'],
+        epsilon=config['epsilon'],
+        replicas=replicas,
+        rng=rng,
+        adversary=adversary
+    )
+    return engine.run()
+
+
+if __name__ == "__main__":
+    num_runs = int(
+        input("How many times do you want to run each configuration? "))
+    configurations = [
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.05,
+            'epsilon': 0.01},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.2,
+            'epsilon': 0.01},
+        {'N': 50, 'f': 9, 'message_loss_rate': 0.4,
+            'epsilon': 0.01},
+        {'N': 250, 'f': 49, 'message_loss_rate': 0.2,
+            'epsilon': 0.01},
+    ]
+
+    # Every replica draws from its own generator, its seed is stored with its run
+    master_seed = seeding.master_seed()
+    print(f"Master seed: {master_seed}")
+    seeds = seeding.spawn_seeds(master_seed)
+
+    results = []  # Store results for JSON
+
+    for config in configurations:
+        replica_seeds = [next(seeds) for _ in range(num_runs)]
+        print(f"\nRunning {num_runs} batched DBAC runs with configuration: {config}")
+        batch = run_batched(config, num_runs, rng=seeding.ReplicaGenerators(replica_seeds))
+        for seed, rounds in zip(replica_seeds, batch):
+            # Same record layout as DBACAlgorithm.py
+            result = {
+                'config': config,
+                'rounds': int(rounds),
+                'num_nodes': config['N'],
+                'message_loss_rate': config['message_loss_rate'],
+                'seed': seed
+            }
+            results.append(result)
+
+    # Write results to JSON file
+    with open('dbac_results.json', 'w') as f:
+        json.dump(results, f, indent=4)
@@ -1,92 +1,110 @@
+import math
 import random
 
+import message_loss
+import tracing
+
 
 class Vehicle:
-    def __init__(self, vehicle_id, initial_state, epsilon, is_byzantine=False):
+    __slots__ = ('vehicle_id', 'rng', 'initial_state', 'current_state', 'epsilon',
+                 'is_byzantine', 'received_states')
+
+    def __init__(self, vehicle_id, initial_state, epsilon, is_byzantine=False, rng=random):
         self.vehicle_id = vehicle_id
+        self.rng = rng  # Generator of the run the vehicle belongs to
         self.initial_state = initial_state
         self.current_state = initial_state
         self.epsilon = epsilon
         self.is_byzantine = is_byzantine
         self.received_states = {}
 
-# TODO:
-# Implement additional Byzantine strategies for more realistic fault simulation
+    def broadcast_state(self, all_vehicles, message_loss_rate, payload=None):
+        """Send the state to every other vehicle of all_vehicles and return the number of lost messages.
 
-    def broadcast_state(self, all_vehicles, message_loss_rate):
+        A Byzantine vehicle sends a random 0 or 1 to each recipient, or the value
+        payload[recipient id] when an adversary payload is given (NaN: nothing sent).
+        """
         message_losses = 0  # Initialize counter for message losses
+        recipients = [vehicle for vehicle in all_vehicles
+                      if vehicle.vehicle_id != self.vehicle_id]
+        lost = message_loss.sample_losses(
+            self.rng, len(recipients), message_loss_rate)
         if self.is_byzantine:
-            print(
-                f"Byzantine Vehicle {self.vehicle_id} broadcasting inconsistent states.")
-            for vehicle in all_vehicles:
-                if vehicle.vehicle_id != self.vehicle_id:
-                    if random.random() > message_loss_rate:
-                        # Send inconsistent states
-                        state_to_send = random.choice([0, 1])
-                        print(
-                            f"Byzantine Vehicle {self.vehicle_id} sent state {state_to_send} to Vehicle {vehicle.vehicle_id}.")
-                        vehicle.receive_state(self.vehicle_id, state_to_send)
+            for vehicle, is_lost in zip(recipients, lost):
+                if not is_lost:
+                    # Send inconsistent states
+                    if payload is None:
+                        state_to_send = self.rng.choice([0, 1])
+                    elif math.isnan(payload[vehicle.vehicle_id]):
+                        continue  # Omitted by the adversary
                     else:
-                        print(
-                            f"Message from Byzantine Vehicle {self.vehicle_id} to Vehicle {vehicle.vehicle_id} lost due to message loss.")
-                        message_losses += 1  # Increment for each lost message
+                        state_to_send = float(payload[vehicle.vehicle_id])
+                    if tracing.level <= tracing.DEBUG:
+                        tracing.emit(tracing.MESSAGE_SENT, self.vehicle_id,
+                                     vehicle.vehicle_id, state_to_send)
+                    vehicle.receive_state(self.vehicle_id, state_to_send)
+                else:
+                    if tracing.level <= tracing.DEBUG:
+                        tracing.emit(tracing.MESSAGE_LOST,
+                                     self.vehicle_id, vehicle.vehicle_id)
+                    message_losses += 1  # Increment for each lost message
         else:
-            print(
-                f"Vehicle {self.vehicle_id} broadcasting state {self.current_state} to all other vehicles.")
-            for vehicle in all_vehicles:
-                if vehicle.vehicle_id != self.vehicle_id:
-                    if random.random() > message_loss_rate:
-                        vehicle.receive_state(
-                            self.vehicle_id, self.current_state)
-                    else:
-                        print(
-                            f"Message from Vehicle {self.vehicle_id} to Vehicle {vehicle.vehicle_id} lost due to message loss.")
-                        message_losses += 1  # Increment for each lost message
+            if tracing.level <= tracing.DEBUG:
+                tracing.emit(tracing.BROADCAST,
+                             self.vehicle_id, self.current_state)
+            for vehicle, is_lost in zip(recipients, lost):
+                if not is_lost:
+                    vehicle.receive_state(
+                        self.vehicle_id, self.current_state)
+                else:
+                    if tracing.level <= tracing.DEBUG:
+                        tracing.emit(tracing.MESSAGE_LOST,
+                                     self.vehicle_id, vehicle.vehicle_id)
+                    message_losses += 1  # Increment for each lost message
 
         return message_losses  # Return total message losses for this broadcast
 
     def receive_state(self, sender_id, state):
         """Receive state from another vehicle."""
-        print(
-            f"Vehicle {self.vehicle_id} received state {state} from Vehicle {sender_id}.")
+        if tracing.level <= tracing.DEBUG:
+            tracing.emit(tracing.MESSAGE_RECEIVED,
+                         self.vehicle_id, sender_id, state)
         self.received_states[sender_id] = state
 
     def update_state(self, total_vehicles, f):
         """Update the vehicle's state based on received messages."""
         all_states = [self.current_state] + list(self.received_states.values())
-        print(
-            f"Vehicle {self.vehicle_id} has all states: {[f'{state}' for state in all_states]}")
 
         missing_states_count = total_vehicles - len(all_states)
         all_states.extend([self.current_state] * missing_states_count)
-        print(
-            f"Vehicle {self.vehicle_id} after filling missing states: {[f'{state}' for state in all_states]}")
 
         trimmed_states = self.trim_states(all_states, f)
-        print(
-            f"Vehicle {self.vehicle_id} trimmed states: {[f'{state}' for state in trimmed_states]}")
 
         self.current_state = sum(trimmed_states) / len(trimmed_states)
-        print(
-            f"Vehicle {self.vehicle_id} updated state: {self.current_state}")
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.STATE_UPDATE,
+                         self.vehicle_id, self.current_state)
 
         self.received_states.clear()
 
     def trim_states(self, all_states, f):
         """Trim the sorted list of states to remove f smallest and f largest values."""
         sorted_states = sorted(all_states)
-        trimmed_states = sorted_states[f:-f]
+        trimmed_states = sorted_states[f:len(sorted_states) - f]
         return trimmed_states
 
     def decide_final_output(self):
         """Decide final output"""
         if self.current_state < 0.5 - self.epsilon / 2:
-            print(f"Vehicle {self.vehicle_id} final decision: 0")
-            return 0
+            decision = 0
         elif self.current_state > 0.5 + self.epsilon / 2:
-            print(f"Vehicle {self.vehicle_id} final decision: 1")
-            return 1
+            decision = 1
         else:
-            print(
-                f"Vehicle {self.vehicle_id} final decision: None")
-            return None
+            decision = None
+        if tracing.level <= tracing.INFO:
+            tracing.emit(tracing.DECISION, self.vehicle_id, decision)
+        return decision
+
+
+# Scalar fields of a Vehicle kept in a node_store.NodeStore when a simulation runs with store=True
+STORED_FIELDS = {'current_state': 'd', 'is_byzantine': 'b'}